@@ -4,7 +4,6 @@
 #include <MadgwickAHRS.h>
 #include <WiFi.h>
 #include <HTTPClient.h>
-#include <ArduinoJson.h>
 
 LSM6 imu;
 LIS3MDL mag;
@@ -21,11 +20,95 @@ const char* ssid = "YourWiFiSSID";
 const char* password = "YourWiFiPassword";
 
 
-const char* serverUrl = "http://your-server-ip:5001/predict";
+const char* serverUrl = "http://your-server-ip:5001/predict/binary";
+String deviceId;
 
-unsigned long lastSendTime = 0;
-const int sendInterval = 20;
-const int httpSendInterval = 200;
+// collect.ino records training data without any delay: about 441 samples
+// in its 1.9 s window, one every ~4.3 ms, paced by its serial output. The
+// glove streams at the same rate so the model sees gestures at the speed it
+// was trained on.
+unsigned long lastSampleTime = 0;
+const unsigned long sampleIntervalMicros = 4300;
+const unsigned long httpSendInterval = 200;
+
+// Binary frame, little-endian: uint16 version, uint16 sample count, uint32
+// sequence, then per sample 5 x uint16 flex and 4 x float32 quaternion.
+const uint16_t frameVersion = 1;
+const int frameHeaderSize = 8;
+const int frameSampleSize = 26;
+const int maxFrameSamples = 64;
+const int frameBufferSize = frameHeaderSize + maxFrameSamples * frameSampleSize;
+uint8_t frameBuffer[frameBufferSize];
+uint16_t frameSamples = 0;
+uint32_t frameSequence = 0;
+
+// Sampling runs in loop() on core 1 and never waits for the network: full
+// frames are handed over through frameQueue to senderTask on core 0, which
+// posts them over one kept-alive connection. If the queue is full the frame
+// is dropped; its sequence number is still used, so the server counts it as
+// lost.
+const int frameQueueLength = 4;
+QueueHandle_t frameQueue;
+HTTPClient http;
+
+void appendSample(uint16_t flex[5], float quat[4]) {
+  uint8_t* record = frameBuffer + frameHeaderSize + frameSamples * frameSampleSize;
+  memcpy(record, flex, 5 * sizeof(uint16_t));
+  memcpy(record + 5 * sizeof(uint16_t), quat, 4 * sizeof(float));
+  frameSamples++;
+}
+
+void queueFrame() {
+  memcpy(frameBuffer, &frameVersion, sizeof(frameVersion));
+  memcpy(frameBuffer + 2, &frameSamples, sizeof(frameSamples));
+  memcpy(frameBuffer + 4, &frameSequence, sizeof(frameSequence));
+
+  if (xQueueSend(frameQueue, frameBuffer, 0) != pdTRUE) {
+    Serial.println("Frame queue full, dropping frame");
+  }
+
+  frameSequence++;
+  frameSamples = 0;
+}
+
+void sendFrame(uint8_t* frame) {
+  uint16_t samples;
+  memcpy(&samples, frame + 2, sizeof(samples));
+
+  // addHeader replaces a header already set, so this is safe on a reused client.
+  http.addHeader("Content-Type", "application/octet-stream");
+  http.addHeader("X-Device-ID", deviceId);
+
+  int httpResponseCode = http.POST(frame, frameHeaderSize + samples * frameSampleSize);
+
+  if (httpResponseCode > 0) {
+    // Reading the whole response keeps the connection usable for the next frame.
+    String response = http.getString();
+    Serial.println("Response: " + response);
+  } else {
+    // The next POST opens a new connection.
+    Serial.print("Error on sending POST: ");
+    Serial.println(httpResponseCode);
+  }
+}
+
+void senderTask(void* parameters) {
+  static uint8_t frame[frameBufferSize];
+
+  http.setReuse(true);
+  http.begin(serverUrl);
+
+  while (true) {
+    if (xQueueReceive(frameQueue, frame, portMAX_DELAY) != pdTRUE) {
+      continue;
+    }
+    if (WiFi.status() == WL_CONNECTED) {
+      sendFrame(frame);
+    } else {
+      Serial.println("WiFi Disconnected");
+    }
+  }
+}
 
 void setup() {
   Serial.begin(115200);
@@ -40,7 +123,8 @@ void setup() {
   pinMode(flexIndex, INPUT);
   pinMode(flexThumb, INPUT);
   
-  filter.begin(50);
+  // No filter.begin(): collect.ino keeps the library's default rate, and the
+  // quaternions have to be integrated the same way as in the training data.
   
 
   WiFi.begin(ssid, password);
@@ -52,14 +136,20 @@ void setup() {
   Serial.println("WiFi connected");
   Serial.println("IP address: ");
   Serial.println(WiFi.localIP());
+  deviceId = WiFi.macAddress();
+  Serial.print("Device ID: ");
+  Serial.println(deviceId);
+  
+  frameQueue = xQueueCreate(frameQueueLength, frameBufferSize);
+  xTaskCreatePinnedToCore(senderTask, "sender", 8192, NULL, 1, NULL, 0);
   
   delay(1000);
 }
 
 void loop() {
-  unsigned long currentTime = millis();
+  unsigned long now = micros();
   
-  if (currentTime - lastSendTime >= sendInterval) {
+  if (now - lastSampleTime >= sampleIntervalMicros) {
     imu.read();
     
     int fl = analogRead(flexLittle);
@@ -82,60 +172,19 @@ void loop() {
     float q2 = filter.q2;
     float q3 = filter.q3;
     
-    
-    Serial.print(fl); Serial.print(",");
-    Serial.print(fr); Serial.print(",");
-    Serial.print(fm); Serial.print(",");
-    Serial.print(fi); Serial.print(",");
-    Serial.print(ft); Serial.print(",");
-    Serial.print(q0); Serial.print(",");
-    Serial.print(q1); Serial.print(",");
-    Serial.print(q2); Serial.print(",");
-    Serial.println(q3);
-    
+    // No per-sample serial echo: at 115200 baud a line takes about as long
+    // as the whole sample interval.
+    uint16_t flex[5] = {(uint16_t)fl, (uint16_t)fr, (uint16_t)fm, (uint16_t)fi, (uint16_t)ft};
+    float quat[4] = {q0, q1, q2, q3};
+    appendSample(flex, quat);
     
     static unsigned long lastHttpSendTime = 0;
-    if (currentTime - lastHttpSendTime >= httpSendInterval) {
-      if (WiFi.status() == WL_CONNECTED) {
-        HTTPClient http;
-        http.begin(serverUrl);
-        http.addHeader("Content-Type", "application/json");
-        
-        
-        StaticJsonDocument<256> doc;
-        doc["flex_little"] = fl;
-        doc["flex_ring"] = fr;
-        doc["flex_middle"] = fm;
-        doc["flex_index"] = fi;
-        doc["flex_thumb"] = ft;
-        doc["quat_w"] = q0;
-        doc["quat_x"] = q1;
-        doc["quat_y"] = q2;
-        doc["quat_z"] = q3;
-        
-        
-        String requestBody;
-        serializeJson(doc, requestBody);
-        
-       
-        int httpResponseCode = http.POST(requestBody);
-        
-        if (httpResponseCode > 0) {
-          String response = http.getString();
-          Serial.println("Response: " + response);
-        } else {
-          Serial.print("Error on sending POST: ");
-          Serial.println(httpResponseCode);
-        }
-        
-        http.end();
-      } else {
-        Serial.println("WiFi Disconnected");
-      }
-      
+    unsigned long currentTime = millis();
+    if (currentTime - lastHttpSendTime >= httpSendInterval || frameSamples == maxFrameSamples) {
+      queueFrame();
       lastHttpSendTime = currentTime;
     }
     
-    lastSendTime = currentTime;
+    lastSampleTime = now;
   }
 }
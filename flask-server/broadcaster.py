@@ -0,0 +1,69 @@
+import json
+import queue
+import threading
+
+class Subscriber:
+    def __init__(self, device_id=None, max_pending=32):
+        self.device_id = device_id
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.dropped = 0
+
+    def deliver(self, payload):
+        # Events are full snapshots, so a slow subscriber only needs the newest
+        # ones: drop the oldest pending event rather than blocking the publisher.
+        while True:
+            try:
+                self.queue.put_nowait(payload)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+class EventBroadcaster:
+    # Fans Server-Sent Events out to subscribers. Subscribers are indexed by the
+    # device they follow (None for all devices), and each event is serialised
+    # once and the same bytes are queued for every matching subscriber.
+    def __init__(self, max_pending=32):
+        self.max_pending = max_pending
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        self.published = 0
+
+    def subscribe(self, device_id=None):
+        subscriber = Subscriber(device_id, self.max_pending)
+        with self._lock:
+            self._subscribers.setdefault(device_id, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            subscribers = self._subscribers.get(subscriber.device_id)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._subscribers[subscriber.device_id]
+
+    def publish(self, device_id, event, data):
+        with self._lock:
+            targets = list(self._subscribers.get(device_id, ()))
+            targets.extend(self._subscribers.get(None, ()))
+
+        if not targets:
+            return 0
+
+        payload = format_event(event, data)
+        for subscriber in targets:
+            subscriber.deliver(payload)
+
+        self.published += 1
+        return len(targets)
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+def format_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n".encode('utf-8')
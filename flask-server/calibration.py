@@ -0,0 +1,91 @@
+import os
+import json
+import time
+import threading
+import numpy as np
+
+NUM_FINGERS = 5
+MAX_CALIBRATION_SAMPLES = 3000
+MIN_CALIBRATION_SAMPLES = 50
+
+# A calibration recording is the hand held open, then closed into a fist.
+# Each finger's threshold is the midpoint between its bent (low percentile)
+# and straight (high percentile) readings; the percentiles ignore spikes.
+BENT_PERCENTILE = 5
+STRAIGHT_PERCENTILE = 95
+MIN_FLEX_RANGE = 100
+
+# Thresholds fitted to the glove leave far fewer borderline samples, so a
+# calibrated detector votes over a shorter window than the defaults
+# (buffer_size 5, count_threshold 3 and 10 buffered predictions).
+CALIBRATED_BUFFER_SIZE = 3
+CALIBRATED_COUNT_THRESHOLD = 2
+CALIBRATED_HISTORY_SIZE = 5
+
+def fit_thresholds(samples):
+    flex = np.asarray(samples, dtype=np.float32)[:, :NUM_FINGERS]
+    if len(flex) < MIN_CALIBRATION_SAMPLES:
+        raise ValueError(f"Calibration needs at least {MIN_CALIBRATION_SAMPLES} samples, got {len(flex)}")
+
+    bent, straight = np.percentile(flex, [BENT_PERCENTILE, STRAIGHT_PERCENTILE], axis=0)
+    flat = np.flatnonzero(straight - bent < MIN_FLEX_RANGE)
+    if len(flat):
+        raise ValueError(f"Flex sensors {flat.tolist()} barely moved during calibration; "
+                         f"open the hand fully and then make a fist")
+
+    return ((bent + straight) / 2).round(1).tolist()
+
+def build_profile(samples):
+    return {
+        'thresholds': fit_thresholds(samples),
+        'buffer_size': CALIBRATED_BUFFER_SIZE,
+        'count_threshold': CALIBRATED_COUNT_THRESHOLD,
+        'history_size': CALIBRATED_HISTORY_SIZE,
+        'samples': len(samples),
+        'calibrated_at': time.time()
+    }
+
+class ProfileStore:
+    # Calibration profiles keyed by device id, kept in one JSON file. The file
+    # is only read when a profile is first asked for, and rewritten atomically
+    # whenever a profile changes.
+    def __init__(self, path):
+        self.path = path
+        self._profiles = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._profiles is None:
+            try:
+                with open(self.path) as f:
+                    self._profiles = json.load(f)
+            except FileNotFoundError:
+                self._profiles = {}
+        return self._profiles
+
+    def _save(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self._profiles, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def get(self, device_id):
+        with self._lock:
+            return self._load().get(device_id)
+
+    def put(self, device_id, profile):
+        with self._lock:
+            self._load()[device_id] = profile
+            self._save()
+
+    def delete(self, device_id):
+        with self._lock:
+            removed = self._load().pop(device_id, None)
+            if removed is not None:
+                self._save()
+            return removed
+
+    def __len__(self):
+        with self._lock:
+            return len(self._load())
@@ -0,0 +1,51 @@
+import struct
+import numpy as np
+
+# Binary sample frames sent by the glove, all little-endian:
+#   header: uint16 version, uint16 sample count, uint32 sequence number
+#   sample: 5 x uint16 flex (little, ring, middle, index, thumb),
+#           4 x float32 quaternion (w, x, y, z)
+FRAME_VERSION = 1
+FRAME_HEADER = struct.Struct('<HHI')
+SAMPLE_DTYPE = np.dtype([('flex', '<u2', (5,)), ('quat', '<f4', (4,))])
+MAX_SEQUENCE = 2 ** 32
+STALE_WINDOW = 16
+
+def decode_frame(body):
+    if len(body) < FRAME_HEADER.size:
+        raise ValueError(f"Frame of {len(body)} bytes is shorter than its header")
+
+    version, count, sequence = FRAME_HEADER.unpack_from(body)
+    if version != FRAME_VERSION:
+        raise ValueError(f"Unsupported frame version {version}")
+
+    expected_size = FRAME_HEADER.size + count * SAMPLE_DTYPE.itemsize
+    if len(body) != expected_size:
+        raise ValueError(f"Frame holds {len(body)} bytes, expected {expected_size} for {count} samples")
+
+    records = np.frombuffer(body, dtype=SAMPLE_DTYPE, count=count, offset=FRAME_HEADER.size)
+    return sequence, records
+
+def frame_features(records):
+    features = np.empty((len(records), 9), dtype=np.float32)
+    features[:, :5] = records['flex']
+    features[:, 5:] = records['quat']
+    return features
+
+def encode_frame(sequence, features):
+    features = np.asarray(features)
+    records = np.empty(len(features), dtype=SAMPLE_DTYPE)
+    records['flex'] = features[:, :5]
+    records['quat'] = features[:, 5:]
+    return FRAME_HEADER.pack(FRAME_VERSION, len(records), sequence % MAX_SEQUENCE) + records.tobytes()
+
+def sequence_gap(last_sequence, sequence):
+    # Number of frames lost since last_sequence, or -1 for a duplicate or a
+    # frame that arrived slightly out of order. Any larger jump backwards means
+    # the device restarted its counter, which is treated as a fresh start.
+    if last_sequence is None:
+        return 0
+    if (last_sequence - sequence) % MAX_SEQUENCE < STALE_WINDOW:
+        return -1
+    gap = (sequence - last_sequence - 1) % MAX_SEQUENCE
+    return gap if gap < MAX_SEQUENCE // 2 else 0
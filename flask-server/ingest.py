@@ -0,0 +1,142 @@
+import logging
+import threading
+from collections import deque
+
+OVERFLOW_POLICIES = ('drop_oldest', 'reject')
+
+logger = logging.getLogger('speakle.ingest')
+
+class IngestQueue:
+    # Bounded per-device sample queues drained by a pool of worker threads.
+    # A device is handled by at most one worker at a time, so its samples stay
+    # in order, and a worker takes everything queued for the device at once,
+    # coalescing a backlog into a single prediction instead of falling further
+    # behind. When a device's queue is full, samples are shed according to the
+    # overflow policy rather than letting latency grow.
+    def __init__(self, process_batch, num_workers=2, max_queue_per_device=64, overflow='drop_oldest'):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy '{overflow}', expected one of {OVERFLOW_POLICIES}")
+
+        self.process_batch = process_batch
+        self.num_workers = num_workers
+        self.max_queue_per_device = max_queue_per_device
+        self.overflow = overflow
+
+        self._queues = {}
+        self._ready = deque()
+        self._scheduled = set()
+        self._cond = threading.Condition()
+        self._workers = []
+        self._running = False
+
+        self.accepted = 0
+        self.shed = 0
+        self.processed = 0
+        self.batches = 0
+        self.errors = 0
+
+    def start(self):
+        with self._cond:
+            if self._running:
+                return self
+            self._running = True
+
+        for i in range(self.num_workers):
+            worker = threading.Thread(target=self._work, name=f'ingest-worker-{i}', daemon=True)
+            worker.start()
+            self._workers.append(worker)
+        return self
+
+    def stop(self, timeout=None):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+
+        for worker in self._workers:
+            worker.join(timeout)
+        self._workers = []
+
+    def submit(self, device_id, samples):
+        if not self._running:
+            self.start()
+
+        accepted = 0
+        shed = 0
+        with self._cond:
+            queue = self._queues.get(device_id)
+            if queue is None:
+                queue = self._queues[device_id] = deque()
+
+            for sample in samples:
+                if len(queue) >= self.max_queue_per_device:
+                    shed += 1
+                    if self.overflow == 'reject':
+                        continue
+                    queue.popleft()
+                queue.append(sample)
+                accepted += 1
+
+            self.accepted += accepted
+            self.shed += shed
+
+            if queue and device_id not in self._scheduled:
+                self._scheduled.add(device_id)
+                self._ready.append(device_id)
+                self._cond.notify()
+
+            depth = len(queue)
+            if not queue:
+                del self._queues[device_id]
+
+        return accepted, shed, depth
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while self._running and not self._ready:
+                    self._cond.wait()
+                if not self._ready:
+                    return
+
+                device_id = self._ready.popleft()
+                queue = self._queues.pop(device_id)
+
+            samples = list(queue)
+            try:
+                self.process_batch(device_id, samples)
+            except Exception as e:
+                self.errors += 1
+                logger.error("Failed to process samples for %s: %s", device_id, e)
+
+            with self._cond:
+                self.processed += len(samples)
+                self.batches += 1
+                if device_id in self._queues:
+                    self._ready.append(device_id)
+                    self._cond.notify()
+                else:
+                    self._scheduled.discard(device_id)
+
+    def depth(self, device_id=None):
+        with self._cond:
+            if device_id is not None:
+                queue = self._queues.get(device_id)
+                return len(queue) if queue is not None else 0
+            return sum(len(queue) for queue in self._queues.values())
+
+    def stats(self):
+        with self._cond:
+            depths = {device_id: len(queue) for device_id, queue in self._queues.items()}
+            return {
+                'workers': self.num_workers,
+                'max_queue_per_device': self.max_queue_per_device,
+                'overflow': self.overflow,
+                'queue_depth': sum(depths.values()),
+                'device_queue_depths': depths,
+                'accepted': self.accepted,
+                'shed': self.shed,
+                'processed': self.processed,
+                'batches': self.batches,
+                'coalesced': self.processed - self.batches,
+                'errors': self.errors
+            }
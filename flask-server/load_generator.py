@@ -0,0 +1,177 @@
+import argparse
+import json
+import threading
+import time
+import urllib.request
+import numpy as np
+
+from frames import encode_frame
+
+# Flex readings (little, ring, middle, index, thumb) that the rule-based
+# detector maps to each gesture; a reading below 1200 counts as bent.
+GESTURE_PATTERNS = {
+    'scanning': [1500, 1500, 1500, 1500, 1500],
+    'hello': [1500, 1500, 1500, 900, 900],
+    'my_name_is': [900, 900, 1500, 1500, 900],
+    'bye': [900, 900, 900, 900, 900]
+}
+
+class SyntheticGlove:
+    def __init__(self, seed, gesture_seconds=2.0, rate=232.0):
+        self.rng = np.random.default_rng(seed)
+        self.patterns = np.array(list(GESTURE_PATTERNS.values()), dtype=np.float32)
+        self.samples_per_gesture = max(1, int(gesture_seconds * rate))
+        self.t = int(self.rng.integers(0, self.samples_per_gesture * len(self.patterns)))
+
+    def next_frame(self, num_samples):
+        steps = self.t + np.arange(num_samples)
+        self.t += num_samples
+
+        gestures = (steps // self.samples_per_gesture) % len(self.patterns)
+        flex = self.patterns[gestures] + self.rng.normal(0, 30, size=(num_samples, 5))
+
+        quat = np.zeros((num_samples, 4), dtype=np.float32)
+        quat[:, 0] = 1.0
+        quat += self.rng.normal(0, 0.01, size=quat.shape)
+        quat /= np.linalg.norm(quat, axis=1, keepdims=True)
+
+        return np.concatenate([np.clip(flex, 0, 4095), quat], axis=1)
+
+class LoadStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.frames = 0
+        self.samples = 0
+        self.bytes = 0
+        self.events = 0
+        self.errors = 0
+        self.send_latencies = []
+
+    def record_send(self, num_samples, num_bytes, latency):
+        with self.lock:
+            self.frames += 1
+            self.samples += num_samples
+            self.bytes += num_bytes
+            self.send_latencies.append(latency)
+
+    def record_event(self):
+        with self.lock:
+            self.events += 1
+
+    def record_error(self):
+        with self.lock:
+            self.errors += 1
+
+    def summary(self, elapsed):
+        latencies = np.array(self.send_latencies) * 1000.0 if self.send_latencies else np.zeros(1)
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        return {
+            'elapsed_s': elapsed,
+            'frames': self.frames,
+            'samples': self.samples,
+            'bytes': self.bytes,
+            'events': self.events,
+            'errors': self.errors,
+            'samples_per_s': self.samples / elapsed if elapsed > 0 else 0.0,
+            'send_ms': {'p50': float(p50), 'p95': float(p95), 'p99': float(p99)}
+        }
+
+def receive_events(client, stats, stop):
+    from simple_websocket import ConnectionClosed
+
+    while not stop.is_set():
+        try:
+            message = client.receive(timeout=0.5)
+        except ConnectionClosed:
+            return
+        if message is None:
+            continue
+        if json.loads(message).get('event') == 'gesture':
+            stats.record_event()
+        else:
+            stats.record_error()
+
+def run_device(index, args, stats, deadline):
+    device_id = f'{args.device_prefix}-{index}'
+    glove = SyntheticGlove(seed=index, rate=args.rate)
+    frame_interval = args.frame_samples / args.rate
+
+    client = None
+    stop = threading.Event()
+    receiver = None
+    if args.mode == 'ws':
+        from simple_websocket import Client
+
+        client = Client(f'ws://{args.host}/stream?device={device_id}')
+        receiver = threading.Thread(target=receive_events, args=(client, stats, stop), daemon=True)
+        receiver.start()
+
+    sequence = 0
+    next_send = time.perf_counter()
+    try:
+        while next_send < deadline:
+            body = encode_frame(sequence, glove.next_frame(args.frame_samples))
+
+            start = time.perf_counter()
+            try:
+                if client is not None:
+                    client.send(body)
+                else:
+                    http_request = urllib.request.Request(
+                        f'http://{args.host}/predict/binary',
+                        data=body,
+                        headers={'Content-Type': 'application/octet-stream', 'X-Device-ID': device_id}
+                    )
+                    with urllib.request.urlopen(http_request, timeout=5) as response:
+                        response.read()
+            except Exception:
+                stats.record_error()
+            else:
+                stats.record_send(args.frame_samples, len(body), time.perf_counter() - start)
+
+            sequence += 1
+            next_send += frame_interval
+            time.sleep(max(0.0, next_send - time.perf_counter()))
+    finally:
+        stop.set()
+        if client is not None:
+            client.close()
+        if receiver is not None:
+            receiver.join(1.0)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Stream synthetic glove data to the gesture server')
+    parser.add_argument('--host', default='localhost:5001', help='server host:port')
+    parser.add_argument('--mode', choices=['ws', 'http'], default='ws',
+                        help='persistent WebSocket stream or one binary POST per frame')
+    parser.add_argument('--devices', type=int, default=4, help='number of simulated gloves')
+    parser.add_argument('--rate', type=float, default=232.0,
+                        help='samples per second per glove (embedded/send.ino streams at ~232)')
+    parser.add_argument('--frame-samples', type=int, default=5, help='samples sent per frame')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds to run')
+    parser.add_argument('--device-prefix', default='loadgen', help='prefix for simulated device IDs')
+    parser.add_argument('--output', help='write the summary as JSON to this file')
+    return parser.parse_args()
+
+if __name__ == '__main__':
+    args = parse_args()
+    stats = LoadStats()
+
+    start = time.perf_counter()
+    deadline = start + args.duration
+    threads = [
+        threading.Thread(target=run_device, args=(i, args, stats, deadline), daemon=True)
+        for i in range(args.devices)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    summary = stats.summary(time.perf_counter() - start)
+    summary.update({'mode': args.mode, 'devices': args.devices, 'rate': args.rate, 'frame_samples': args.frame_samples})
+    print(json.dumps(summary, indent=2))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(summary, f, indent=2)
@@ -0,0 +1,109 @@
+import threading
+from bisect import bisect_left
+
+# Exponential buckets from 10 us to about 10 s.
+DEFAULT_BUCKETS = [1e-5 * 2 ** i for i in range(21)]
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def format_labels(label, value):
+    if label is None:
+        return ''
+    return f'{{{label}="{escape_label(value)}"}}'
+
+class Counter:
+    def __init__(self, name, help_text, label=None):
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, label_value=None, amount=1):
+        with self.lock:
+            self.values[label_value] = self.values.get(label_value, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        with self.lock:
+            values = list(self.values.items())
+        for label_value, value in values:
+            lines.append(f'{self.name}{format_labels(self.label, label_value)} {value}')
+        return lines
+
+class Histogram:
+    # Observations only bump one bucket count and the sum; buckets are
+    # accumulated into Prometheus' cumulative form when rendered.
+    def __init__(self, name, help_text, label=None, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self.bounds = list(buckets)
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, label_value=None):
+        index = bisect_left(self.bounds, value)
+        with self.lock:
+            series = self.series.get(label_value)
+            if series is None:
+                series = self.series[label_value] = [[0] * (len(self.bounds) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self.lock:
+            series = [(label_value, list(counts), total) for label_value, (counts, total) in self.series.items()]
+
+        for label_value, counts, total in series:
+            prefix = f'{self.label}="{escape_label(label_value)}",' if self.label is not None else ''
+            cumulative = 0
+            for bound, count in zip(self.bounds + ['+Inf'], counts):
+                cumulative += count
+                le = bound if bound == '+Inf' else f'{bound:.6g}'
+                lines.append(f'{self.name}_bucket{{{prefix}le="{le}"}} {cumulative}')
+            labels = format_labels(self.label, label_value)
+            lines.append(f'{self.name}_sum{labels} {total}')
+            lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+class CallbackMetric:
+    # Values read from existing state (sessions, queues) when /metrics is
+    # scraped, so the hot path does not have to maintain them.
+    def __init__(self, name, help_text, metric_type, label, collect):
+        self.name = name
+        self.help_text = help_text
+        self.metric_type = metric_type
+        self.label = label
+        self.collect = collect
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} {self.metric_type}']
+        for label_value, value in self.collect():
+            lines.append(f'{self.name}{format_labels(self.label, label_value)} {value}')
+        return lines
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = []
+
+    def counter(self, name, help_text, label=None):
+        return self.register(Counter(name, help_text, label))
+
+    def histogram(self, name, help_text, label=None, buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, help_text, label, buckets))
+
+    def callback(self, name, help_text, metric_type, label, collect):
+        return self.register(CallbackMetric(name, help_text, metric_type, label, collect))
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
@@ -1,42 +1,358 @@
-from flask import Flask, jsonify, request, render_template
+import time
+started_at = time.perf_counter()
+
+from flask import Flask, jsonify, request, render_template, Response, g
 from flask_cors import CORS
 import numpy as np
 import sys
 import os
-import time
+import json
+import queue
+import math
+import logging
+import threading
 from collections import Counter, deque
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '../model/predict_module'))
-from predictor import GesturePredictor
-from simple_predictor import predict_gesture, initialize_detector
+from simple_predictor import SimpleGestureDetector, parse_sensor_data
+from sessions import SessionRegistry, DEFAULT_DEVICE_ID, SENSOR_KEYS, default_latest_data
+from ingest import IngestQueue
+from frames import decode_frame, frame_features, sequence_gap
+from broadcaster import EventBroadcaster, format_event
+from metrics import MetricsRegistry
+from calibration import ProfileStore, build_profile, MAX_CALIBRATION_SAMPLES
+
+try:
+    from flask_sock import Sock
+except ImportError:
+    Sock = None
 
 app = Flask(__name__)
 CORS(app)
 
-gesture_ids = {
-    -1: "collecting_data",
-    0: "scanning",
-    1: "hello",
-    2: "my_name_is",
-    3: "bye"
-}
+SESSION_IDLE_TIMEOUT = float(os.environ.get('SPEAKLE_SESSION_IDLE_TIMEOUT', 300))
+MAX_SESSIONS = int(os.environ.get('SPEAKLE_MAX_SESSIONS', 256))
+PREDICTION_HISTORY = 10
+
+# Per-device flex thresholds fitted by /calibration, used by the simple
+# predictor. Profiles are read from disk the first time a device connects.
+PROFILE_PATH = os.environ.get('SPEAKLE_PROFILE_PATH', os.path.join(os.path.dirname(__file__), 'profiles.json'))
 
-latest_data = {
-    'flex_little': 1500,
-    'flex_ring': 1500,
-    'flex_middle': 1500,
-    'flex_index': 1500,
-    'flex_thumb': 1500,
-    'quat_w': 1.0,
-    'quat_x': 0.0,
-    'quat_y': 0.0,
-    'quat_z': 0.0,
-    'gesture_id': 0,
-    'gesture_name': 'scanning',
-    'timestamp': time.time()
+# 'simple' uses the rule-based flex detector, 'cnn' the trained model with
+# windows from all devices batched together by the inference scheduler, or
+# evaluated incrementally per device with SPEAKLE_STREAMING=1 (numpy backend).
+# SPEAKLE_MODEL_BACKEND=tflite runs a quantized export from train.py --quantize.
+PREDICTOR = os.environ.get('SPEAKLE_PREDICTOR', 'simple')
+MODEL_BACKEND = os.environ.get('SPEAKLE_MODEL_BACKEND', 'keras')
+QUANTIZATION = os.environ.get('SPEAKLE_QUANTIZATION', 'int8')
+STREAMING = os.environ.get('SPEAKLE_STREAMING', '0') == '1'
+BATCH_MAX_SIZE = int(os.environ.get('SPEAKLE_BATCH_MAX_SIZE', 32))
+BATCH_MAX_WAIT_MS = float(os.environ.get('SPEAKLE_BATCH_MAX_WAIT_MS', 5))
+
+# Setting SPEAKLE_MOTION_THRESHOLD (scaled units, e.g. 0.05) lets the cnn
+# predictor skip inference while a glove is at rest.
+MOTION_THRESHOLD = float(os.environ['SPEAKLE_MOTION_THRESHOLD']) if os.environ.get('SPEAKLE_MOTION_THRESHOLD') else None
+MOTION_HYSTERESIS = float(os.environ.get('SPEAKLE_MOTION_HYSTERESIS', 0.5))
+MOTION_MAX_SKIP = int(os.environ.get('SPEAKLE_MOTION_MAX_SKIP', 50))
+MOTION_GATE = {
+    'motion_threshold': MOTION_THRESHOLD,
+    'motion_hysteresis': MOTION_HYSTERESIS,
+    'max_skip': MOTION_MAX_SKIP
 }
 
-prediction_buffer = deque(maxlen=10)
+# The cnn predictor follows the active version of the model registry
+# (saved_model/ACTIVE), checked every SPEAKLE_MODEL_POLL_INTERVAL seconds (0
+# disables polling; POST /model/reload always works). A new version is loaded
+# and warmed up in the background, then each device switches over between
+# two of its samples, keeping its buffered window.
+MODEL_POLL_INTERVAL = float(os.environ.get('SPEAKLE_MODEL_POLL_INTERVAL', 5))
+
+# SPEAKLE_INFERENCE_WORKERS=N runs the cnn predictor (numpy backend) in N
+# processes sharing memory-mapped weights, each device pinned to one worker.
+INFERENCE_WORKERS = int(os.environ.get('SPEAKLE_INFERENCE_WORKERS', 0))
+
+INGEST_WORKERS = int(os.environ.get('SPEAKLE_INGEST_WORKERS', 2))
+INGEST_QUEUE_SIZE = int(os.environ.get('SPEAKLE_INGEST_QUEUE_SIZE', 64))
+INGEST_OVERFLOW = os.environ.get('SPEAKLE_INGEST_OVERFLOW', 'drop_oldest')
+
+# Dashboard events are pushed only when a device's data changes. Gesture
+# changes go out immediately, sensor-only changes at most once per interval.
+EVENT_MIN_INTERVAL = float(os.environ.get('SPEAKLE_EVENT_MIN_INTERVAL', 0.1))
+EVENT_HEARTBEAT = float(os.environ.get('SPEAKLE_EVENT_HEARTBEAT', 15))
+EVENT_QUEUE_SIZE = int(os.environ.get('SPEAKLE_EVENT_QUEUE_SIZE', 32))
+
+# Per-request lines are logged at DEBUG, and only one in every
+# SPEAKLE_LOG_SAMPLE_EVERY requests; set SPEAKLE_LOG_LEVEL=WARNING to turn
+# them off entirely in production.
+LOG_LEVEL = os.environ.get('SPEAKLE_LOG_LEVEL', 'INFO').upper()
+LOG_SAMPLE_EVERY = max(1, int(os.environ.get('SPEAKLE_LOG_SAMPLE_EVERY', 1)))
+
+logging.basicConfig(level=LOG_LEVEL, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+logger = logging.getLogger('speakle')
+request_count = 0
+
+def sample_request():
+    global request_count
+    request_count += 1
+    return request_count % LOG_SAMPLE_EVERY == 0
+
+gesture_model = None
+inference_scheduler = None
+worker_pool = None
+model_version = None
+reload_lock = threading.RLock()
+startup_timings = {}
+
+def serving_backend():
+    # The inference workers only run the numpy backend.
+    return 'numpy' if INFERENCE_WORKERS > 0 else MODEL_BACKEND
+
+def load_gesture_model():
+    # The predictor module, and TensorFlow with the keras and tflite backends,
+    # are only imported once the cnn predictor is actually used.
+    global gesture_model, model_version
+    
+    if gesture_model is None:
+        from predictor import get_model
+        
+        gesture_model = get_model(
+            MODEL_BACKEND,
+            quantization=QUANTIZATION,
+            warm_up_batch_sizes=(1,) if STREAMING else (1, BATCH_MAX_SIZE)
+        )
+        model_version = gesture_model.version
+        startup_timings['model_load'] = gesture_model.load_seconds
+        startup_timings['model_warm_up'] = gesture_model.warm_up_seconds
+    
+    return gesture_model
+
+def start_worker_pool():
+    global worker_pool, model_version
+    
+    if worker_pool is None:
+        from worker_pool import InferenceWorkerPool
+        
+        if os.environ.get('SPEAKLE_MODEL_BACKEND', 'numpy') != 'numpy':
+            logger.warning("SPEAKLE_MODEL_BACKEND=%s is ignored: inference workers always run the numpy backend",
+                           MODEL_BACKEND)
+        
+        start = time.perf_counter()
+        worker_pool = InferenceWorkerPool(
+            INFERENCE_WORKERS,
+            predictor_options={'streaming': STREAMING, **MOTION_GATE},
+            idle_timeout=SESSION_IDLE_TIMEOUT
+        ).start()
+        model_version = worker_pool.version
+        startup_timings['worker_start'] = time.perf_counter() - start
+    
+    return worker_pool
+
+def create_scheduler(model):
+    from batch_scheduler import InferenceScheduler
+    
+    return InferenceScheduler(
+        model,
+        max_batch_size=BATCH_MAX_SIZE,
+        max_wait_ms=BATCH_MAX_WAIT_MS
+    ).start()
+
+def reload_model(version=None):
+    # Loading and warming up happen before anything is swapped, so requests
+    # keep using the old model meanwhile. Windows are batched per model, so
+    # the scheduled path gets a fresh scheduler and the old one drains.
+    global gesture_model, inference_scheduler, model_version
+    
+    from model_registry import resolve_model_dirs
+    from predictor import MODEL_DIR, DATASET_DIR, get_model, discard_model
+    
+    with reload_lock:
+        model_dir, dataset_dir, version = resolve_model_dirs(MODEL_DIR, DATASET_DIR, version)
+        start = time.perf_counter()
+        
+        if worker_pool is not None:
+            if (model_dir, dataset_dir) != (worker_pool.model_dir, worker_pool.dataset_dir):
+                worker_pool.reload(model_dir, dataset_dir, version)
+            model_version = version
+            return version, time.perf_counter() - start
+        
+        old_model, old_scheduler = gesture_model, inference_scheduler
+        new_model = get_model(
+            MODEL_BACKEND,
+            model_dir,
+            dataset_dir,
+            quantization=QUANTIZATION,
+            warm_up_batch_sizes=(1,) if STREAMING else (1, BATCH_MAX_SIZE),
+            version=version
+        )
+        if new_model is old_model:
+            # get_model() returned the cached model being served: same version.
+            model_version = version
+            return version, time.perf_counter() - start
+        new_scheduler = create_scheduler(new_model) if old_scheduler is not None else None
+        
+        gesture_model, inference_scheduler, model_version = new_model, new_scheduler, version
+        for session in sessions.sessions():
+            with session.lock:
+                detector = session.detector
+                if detector.model is not new_model or detector.scheduler is not new_scheduler:
+                    detector.set_model(new_model, new_scheduler)
+        
+        # Only once no detector can submit to it any more.
+        if old_scheduler is not None and old_scheduler is not new_scheduler and not any(
+            session.detector.scheduler is old_scheduler for session in sessions.sessions()
+        ):
+            old_scheduler.stop()
+        if old_model is not None:
+            discard_model(old_model)
+        
+        return version, time.perf_counter() - start
+
+def watch_model_registry():
+    from model_registry import active_version
+    from predictor import MODEL_DIR
+    
+    failed_version = None
+    while True:
+        time.sleep(MODEL_POLL_INTERVAL)
+        try:
+            # Checked under the lock, so a POST /model/reload?version= that is
+            # still loading its version is not undone with the old pointer.
+            with reload_lock:
+                version = active_version(MODEL_DIR)
+                if version is None or version == model_version or version == failed_version:
+                    continue
+                logger.info("Model version %s activated, reloading", version)
+                try:
+                    version, seconds = reload_model(version)
+                except Exception:
+                    # Retried only once ACTIVE names another version.
+                    failed_version = version
+                    raise
+            failed_version = None
+            model_reloads.inc()
+            logger.info("Now serving model version %s (loaded in %.2fs)", version, seconds)
+        except Exception as e:
+            logger.error("Model reload failed: %s", e)
+
+def create_detector(device_id):
+    global inference_scheduler
+    
+    if PREDICTOR == 'simple':
+        return SimpleGestureDetector()
+    
+    if INFERENCE_WORKERS > 0:
+        return start_worker_pool().predictor(device_id)
+    
+    from predictor import GesturePredictor
+    
+    model = load_gesture_model()
+    
+    if STREAMING:
+        return GesturePredictor(model=model, streaming=True, **MOTION_GATE)
+    
+    if inference_scheduler is None:
+        inference_scheduler = create_scheduler(model)
+    
+    return GesturePredictor(model=model, scheduler=inference_scheduler, **MOTION_GATE)
+
+profiles = ProfileStore(PROFILE_PATH)
+
+def apply_profile(session, profile):
+    detector = session.detector
+    if profile is None:
+        detector.thresholds = None
+        detector.buffer_size = 5
+        detector.count_threshold = 3
+        session.prediction_buffer = deque(maxlen=PREDICTION_HISTORY)
+    else:
+        detector.thresholds = profile['thresholds']
+        detector.buffer_size = profile['buffer_size']
+        detector.count_threshold = profile['count_threshold']
+        session.prediction_buffer = deque(maxlen=profile['history_size'])
+    session.profile = profile
+
+def load_profile(session):
+    if PREDICTOR != 'simple':
+        return
+    
+    profile = profiles.get(session.device_id)
+    if profile is not None:
+        apply_profile(session, profile)
+
+def follow_reload(session):
+    # A detector built while reload_model() was swapping models can still hold
+    # the old model and scheduler, but its session was not registered yet for
+    # reload_model() to re-point it.
+    if PREDICTOR != 'cnn' or INFERENCE_WORKERS > 0:
+        return
+    
+    with session.lock:
+        detector = session.detector
+        if detector.model is not gesture_model or detector.scheduler is not inference_scheduler:
+            detector.set_model(gesture_model, inference_scheduler)
+
+sessions = SessionRegistry(
+    create_detector,
+    idle_timeout=SESSION_IDLE_TIMEOUT,
+    max_sessions=MAX_SESSIONS,
+    history_size=PREDICTION_HISTORY,
+    on_create=load_profile,
+    on_register=follow_reload
+)
+
+broadcaster = EventBroadcaster(max_pending=EVENT_QUEUE_SIZE)
+
+metrics = MetricsRegistry()
+request_seconds = metrics.histogram('speakle_request_seconds', 'Request handling time by endpoint.', 'endpoint')
+stage_seconds = metrics.histogram('speakle_stage_seconds', 'Time spent in each prediction stage.', 'stage')
+errors_total = metrics.counter('speakle_errors_total', 'Failed requests by endpoint.', 'endpoint')
+model_reloads = metrics.counter('speakle_model_reloads_total', 'Model versions swapped in without a restart.')
+metrics.callback('speakle_device_samples_total', 'Samples processed per device.', 'counter', 'device',
+                 lambda: [(s.device_id, s.sample_count) for s in sessions.sessions()])
+metrics.callback('speakle_device_frames_lost_total', 'Binary frames lost per device.', 'counter', 'device',
+                 lambda: [(s.device_id, s.frames_lost) for s in sessions.sessions()])
+metrics.callback('speakle_device_frames_stale_total', 'Stale or duplicate binary frames per device.', 'counter', 'device',
+                 lambda: [(s.device_id, s.frames_stale) for s in sessions.sessions()])
+metrics.callback('speakle_device_last_seen_seconds', 'Unix time of the last sample per device.', 'gauge', 'device',
+                 lambda: [(s.device_id, s.last_seen) for s in sessions.sessions()])
+metrics.callback('speakle_device_inferences_total', 'Model inferences run per device.', 'counter', 'device',
+                 lambda: [(s.device_id, s.detector.inferences) for s in sessions.sessions() if hasattr(s.detector, 'inferences')])
+metrics.callback('speakle_device_inferences_skipped_total', 'Inferences skipped by the motion gate per device.', 'counter', 'device',
+                 lambda: [(s.device_id, s.detector.skipped) for s in sessions.sessions() if hasattr(s.detector, 'skipped')])
+metrics.callback('speakle_startup_seconds', 'Time spent in each startup stage.', 'gauge', 'stage',
+                 lambda: list(startup_timings.items()))
+metrics.callback('speakle_worker_requests_total', 'Requests routed to each inference worker.', 'counter', 'worker',
+                 lambda: list(enumerate(worker_pool.requests_per_worker)) if worker_pool is not None else [])
+metrics.callback('speakle_devices', 'Active device sessions.', 'gauge', None,
+                 lambda: [(None, len(sessions))])
+metrics.callback('speakle_ingest_queue_depth', 'Samples waiting in the ingest queue.', 'gauge', None,
+                 lambda: [(None, ingest_queue.depth())])
+metrics.callback('speakle_ingest_shed_total', 'Samples shed by the ingest queue.', 'counter', None,
+                 lambda: [(None, ingest_queue.shed)])
+metrics.callback('speakle_ingest_errors_total', 'Ingest batches that failed to process.', 'counter', None,
+                 lambda: [(None, ingest_queue.errors)])
+metrics.callback('speakle_event_subscribers', 'Connected dashboard event streams.', 'gauge', None,
+                 lambda: [(None, broadcaster.subscriber_count())])
+
+@app.before_request
+def start_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request(response):
+    start = g.get('request_start')
+    if start is not None:
+        request_seconds.observe(time.perf_counter() - start, request.endpoint or 'unknown')
+    return response
+
+def gesture_name(session, gesture_id):
+    return session.detector.gesture_names.get(gesture_id, "unknown")
+
+def resolve_device_id(data=None):
+    device_id = request.headers.get('X-Device-ID') or request.args.get('device')
+    if not device_id and isinstance(data, dict):
+        device_id = data.get('device_id')
+    return str(device_id) if device_id else DEFAULT_DEVICE_ID
 
 @app.route('/', methods=['GET'])
 def index():
@@ -44,11 +360,15 @@ def index():
 
 @app.route("/predict", methods=["POST"])
 def predict():
+    start = time.perf_counter()
     data = request.json
     
     if not data or not isinstance(data, dict):
         return jsonify({"error": "Invalid data format"}), 400
     
+    session = sessions.get_or_create(resolve_device_id(data))
+    sampled = sample_request()
+    
     input_data = {
         'flex_little': data.get('flex_little'),
         'flex_ring': data.get('flex_ring'),
@@ -61,18 +381,8 @@ def predict():
         'quat_z': data.get('quat_z')
     }
     
-    print("\n===== RECEIVED DATA =====")
-    print(f"  Flex Little: {input_data['flex_little']}")
-    print(f"  Flex Ring: {input_data['flex_ring']}")
-    print(f"  Flex Middle: {input_data['flex_middle']}")
-    print(f"  Flex Index: {input_data['flex_index']}")
-    print(f"  Flex Thumb: {input_data['flex_thumb']}")
-    print(f"  Quaternion W: {input_data['quat_w']}")
-    print(f"  Quaternion X: {input_data['quat_x']}")
-    print(f"  Quaternion Y: {input_data['quat_y']}")
-    print(f"  Quaternion Z: {input_data['quat_z']}")
-    
-    global latest_data
+    if sampled and logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Received data from %s: %s", session.device_id, input_data)
     
     missing_values = []
     for key, value in input_data.items():
@@ -80,55 +390,361 @@ def predict():
             missing_values.append(key)
     
     if missing_values:
-        print(f"WARNING: Missing values for: {', '.join(missing_values)}")
-        print("Using default values from latest_data for prediction")
+        if sampled:
+            logger.warning("Missing values from %s for %s, using latest_data", session.device_id, ', '.join(missing_values))
         for key in missing_values:
-            input_data[key] = latest_data.get(key)
+            input_data[key] = session.latest_data.get(key)
     
     try:
-        prediction = predict_gesture(input_data)
-        prediction_buffer.append(prediction)
-        
-        most_frequent = most_common(list(prediction_buffer))
-        
-        gesture_name = gesture_ids.get(most_frequent, "unknown")
-        
-        print(f"Predicted gesture: {prediction} ({gesture_ids.get(int(prediction), 'unknown')})")
-        print(f"Most frequent gesture: {most_frequent} ({gesture_name})")
-        print("===========================")
-        
-        latest_data = {
-            'flex_little': input_data['flex_little'],
-            'flex_ring': input_data['flex_ring'],
-            'flex_middle': input_data['flex_middle'],
-            'flex_index': input_data['flex_index'],
-            'flex_thumb': input_data['flex_thumb'],
-            'quat_w': input_data['quat_w'],
-            'quat_x': input_data['quat_x'],
-            'quat_y': input_data['quat_y'],
-            'quat_z': input_data['quat_z'],
-            'gesture_id': most_frequent,
-            'gesture_name': gesture_name,
-            'timestamp': time.time()
-        }
+        features = sensor_features(input_data)
+    except ValueError as e:
+        return jsonify({"error": str(e), "success": False}), 400
+    stage_seconds.observe(time.perf_counter() - start, 'parse')
+    
+    try:
+        prediction, most_frequent = process_samples(session, [features])
+        
+        most_frequent_name = gesture_name(session, most_frequent)
+        
+        if sampled and logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Predicted gesture for %s: %s (%s), most frequent: %s (%s)", session.device_id,
+                         prediction, gesture_name(session, prediction), most_frequent, most_frequent_name)
         
         response = {
-            "prediction": int(prediction),
-            "prediction_name": gesture_ids.get(int(prediction), "unknown"),
+            "device_id": session.device_id,
+            "prediction": prediction,
+            "prediction_name": gesture_name(session, prediction),
             "most_frequent": most_frequent,
-            "most_frequent_name": gesture_name,
+            "most_frequent_name": most_frequent_name,
             "success": True
         }
         
-        return jsonify(response)
+        return serialize(response)
     
     except Exception as e:
-        print(f"ERROR in prediction: {str(e)}")
+        errors_total.inc('predict')
+        logger.error("Prediction failed for %s: %s", session.device_id, e)
         return jsonify({
             "error": str(e),
             "success": False
         }), 500
 
+def sensor_features(input_data):
+    # Every value is checked before process_samples() touches the session, so
+    # a malformed sample is rejected as a whole instead of half applied.
+    features = parse_sensor_data(input_data)
+    try:
+        features = [float(value) for value in features]
+    except (TypeError, ValueError):
+        raise ValueError(f"Sensor values must be numbers, got {dict(zip(SENSOR_KEYS, features))}")
+    if not all(math.isfinite(value) for value in features):
+        raise ValueError(f"Sensor values must be finite, got {dict(zip(SENSOR_KEYS, features))}")
+    return features
+
+def serialize(response):
+    start = time.perf_counter()
+    serialized = jsonify(response)
+    stage_seconds.observe(time.perf_counter() - start, 'serialize')
+    return serialized
+
+def record_stages(detector):
+    for stage, seconds in getattr(detector, 'last_timings', {}).items():
+        stage_seconds.observe(seconds, stage)
+
+def process_samples(session, samples):
+    with session.lock:
+        start = time.perf_counter()
+        for sample in samples[:-1]:
+            session.detector.add_sample(sample)
+        
+        sample = samples[-1]
+        prediction = int(session.detector.predict(sample))
+        stage_seconds.observe(time.perf_counter() - start, 'detector')
+        record_stages(session.detector)
+        session.prediction_buffer.append(prediction)
+        session.sample_count += len(samples)
+        
+        if session.calibration_samples is not None:
+            room = MAX_CALIBRATION_SAMPLES - len(session.calibration_samples)
+            session.calibration_samples.extend(list(sample) for sample in samples[:room])
+        
+        most_frequent = most_common(list(session.prediction_buffer))
+        
+        session.latest_data = {
+            'device_id': session.device_id,
+            'flex_little': int(sample[0]),
+            'flex_ring': int(sample[1]),
+            'flex_middle': int(sample[2]),
+            'flex_index': int(sample[3]),
+            'flex_thumb': int(sample[4]),
+            'quat_w': float(sample[5]),
+            'quat_x': float(sample[6]),
+            'quat_y': float(sample[7]),
+            'quat_z': float(sample[8]),
+            'gesture_id': most_frequent,
+            'gesture_name': gesture_name(session, most_frequent),
+            'timestamp': time.time()
+        }
+        snapshot = changed_snapshot(session)
+    
+    if snapshot is not None:
+        broadcaster.publish(session.device_id, 'update', snapshot)
+    
+    return prediction, most_frequent
+
+def changed_snapshot(session):
+    data = session.latest_data
+    state = tuple(data[key] for key in SENSOR_KEYS) + (data['gesture_id'],)
+    previous = session.published_state
+    if state == previous:
+        return None
+    
+    gesture_changed = previous is None or previous[-1] != data['gesture_id']
+    if not gesture_changed and data['timestamp'] - session.published_at < EVENT_MIN_INTERVAL:
+        return None
+    
+    session.published_state = state
+    session.published_at = data['timestamp']
+    return data
+
+def read_frame(session, body):
+    start = time.perf_counter()
+    sequence, records = decode_frame(body)
+    
+    with session.lock:
+        gap = sequence_gap(session.last_sequence, sequence)
+        if gap < 0:
+            session.frames_stale += 1
+            return sequence, None
+        session.frames_lost += gap
+        session.last_sequence = sequence
+    
+    features = frame_features(records)
+    stage_seconds.observe(time.perf_counter() - start, 'parse')
+    return sequence, features
+
+def process_queued_samples(device_id, samples):
+    process_samples(sessions.get_or_create(device_id), samples)
+
+ingest_queue = IngestQueue(
+    process_queued_samples,
+    num_workers=INGEST_WORKERS,
+    max_queue_per_device=INGEST_QUEUE_SIZE,
+    overflow=INGEST_OVERFLOW
+)
+
+@app.route("/ingest", methods=["POST"])
+def ingest():
+    if request.mimetype == 'application/octet-stream':
+        return ingest_binary()
+    
+    data = request.json
+    samples = data if isinstance(data, list) else [data]
+    
+    if not samples or not all(isinstance(sample, dict) for sample in samples):
+        return jsonify({"error": "Invalid data format"}), 400
+    
+    session = sessions.get_or_create(resolve_device_id(samples[0]))
+    
+    try:
+        features = json_features(session, samples)
+    except ValueError as e:
+        return jsonify({"error": str(e), "success": False}), 400
+    
+    return ingest_response(session, features)
+
+def json_features(session, samples):
+    features = []
+    for sample in samples:
+        input_data = {key: sample.get(key) for key in SENSOR_KEYS}
+        for key, value in input_data.items():
+            if value is None:
+                input_data[key] = session.latest_data.get(key)
+        features.append(sensor_features(input_data))
+    return features
+
+def ingest_binary():
+    session = sessions.get_or_create(resolve_device_id())
+    
+    try:
+        sequence, features = read_frame(session, request.get_data(cache=False))
+    except ValueError as e:
+        return jsonify({"error": str(e), "success": False}), 400
+    
+    return ingest_response(session, features if features is not None else [], sequence)
+
+def ingest_response(session, features, sequence=None):
+    if len(features):
+        accepted, shed, depth = ingest_queue.submit(session.device_id, features)
+    else:
+        accepted, shed, depth = 0, 0, ingest_queue.depth(session.device_id)
+    
+    response = {
+        "device_id": session.device_id,
+        "accepted": accepted,
+        "shed": shed,
+        "queue_depth": depth,
+        "gesture_id": session.latest_data['gesture_id'],
+        "gesture_name": session.latest_data['gesture_name'],
+        "success": True
+    }
+    if sequence is not None:
+        response['sequence'] = sequence
+    
+    return jsonify(response), 202
+
+@app.route("/predict/binary", methods=["POST"])
+def predict_binary():
+    session = sessions.get_or_create(resolve_device_id())
+    
+    try:
+        sequence, features = read_frame(session, request.get_data(cache=False))
+    except ValueError as e:
+        return jsonify({"error": str(e), "success": False}), 400
+    
+    if features is None or len(features) == 0:
+        return serialize({
+            "device_id": session.device_id,
+            "sequence": sequence,
+            "samples": 0,
+            "most_frequent": session.latest_data['gesture_id'],
+            "most_frequent_name": session.latest_data['gesture_name'],
+            "success": True
+        })
+    
+    try:
+        prediction, most_frequent = process_samples(session, features)
+    except Exception as e:
+        errors_total.inc('predict_binary')
+        logger.error("Prediction failed for %s: %s", session.device_id, e)
+        return jsonify({"error": str(e), "success": False}), 500
+    
+    return serialize({
+        "device_id": session.device_id,
+        "sequence": sequence,
+        "samples": len(features),
+        "prediction": prediction,
+        "prediction_name": gesture_name(session, prediction),
+        "most_frequent": most_frequent,
+        "most_frequent_name": gesture_name(session, most_frequent),
+        "success": True
+    })
+
+def stream(ws):
+    device_id = resolve_device_id()
+    last_gesture = None
+    
+    session = sessions.get_or_create(device_id)
+    with session.lock:
+        session.last_sequence = None
+    
+    while True:
+        message = ws.receive()
+        session = sessions.get_or_create(device_id)
+        
+        try:
+            if isinstance(message, str):
+                data = json.loads(message)
+                samples = data if isinstance(data, list) else [data]
+                if not all(isinstance(sample, dict) for sample in samples):
+                    raise ValueError("Invalid data format")
+                features = json_features(session, samples)
+            else:
+                _, features = read_frame(session, message)
+        except ValueError as e:
+            ws.send(json.dumps({"event": "error", "error": str(e)}))
+            continue
+        
+        if features is None or len(features) == 0:
+            continue
+        
+        try:
+            prediction, most_frequent = process_samples(session, features)
+        except Exception as e:
+            errors_total.inc('stream')
+            logger.error("Prediction failed for %s: %s", device_id, e)
+            ws.send(json.dumps({"event": "error", "error": str(e)}))
+            continue
+        
+        if most_frequent != last_gesture:
+            last_gesture = most_frequent
+            ws.send(json.dumps({
+                "event": "gesture",
+                "device_id": device_id,
+                "gesture_id": most_frequent,
+                "gesture_name": gesture_name(session, most_frequent),
+                "prediction": prediction,
+                "timestamp": time.time()
+            }))
+
+if Sock is not None:
+    Sock(app).route('/stream')(stream)
+
+@app.route("/calibration", methods=["GET"])
+def calibration():
+    device_id = resolve_device_id()
+    session = sessions.get(device_id)
+    return jsonify({
+        "device_id": device_id,
+        "calibrating": session is not None and session.calibration_samples is not None,
+        "samples": len(session.calibration_samples) if session is not None and session.calibration_samples else 0,
+        "profile": profiles.get(device_id)
+    })
+
+@app.route("/calibration/start", methods=["POST"])
+def calibration_start():
+    if PREDICTOR != 'simple':
+        return jsonify({"error": "Calibration is only used by the simple predictor", "success": False}), 400
+    
+    session = sessions.get_or_create(resolve_device_id())
+    with session.lock:
+        session.calibration_samples = []
+    
+    logger.info("Calibrating %s: hold the hand open, then make a fist", session.device_id)
+    return jsonify({"device_id": session.device_id, "calibrating": True, "success": True})
+
+@app.route("/calibration/finish", methods=["POST"])
+def calibration_finish():
+    session = sessions.get(resolve_device_id())
+    if session is None or session.calibration_samples is None:
+        return jsonify({"error": "Calibration was not started for this device", "success": False}), 400
+    
+    with session.lock:
+        samples = session.calibration_samples
+        session.calibration_samples = None
+        
+        try:
+            profile = build_profile(samples)
+        except ValueError as e:
+            return jsonify({"error": str(e), "success": False}), 400
+        
+        apply_profile(session, profile)
+    
+    profiles.put(session.device_id, profile)
+    logger.info("Calibrated %s from %d samples: thresholds %s", session.device_id, len(samples), profile['thresholds'])
+    return jsonify({"device_id": session.device_id, "profile": profile, "success": True})
+
+@app.route("/calibration", methods=["DELETE"])
+def calibration_reset():
+    device_id = resolve_device_id()
+    removed = profiles.delete(device_id)
+    
+    session = sessions.get(device_id)
+    if session is not None and PREDICTOR == 'simple':
+        with session.lock:
+            session.calibration_samples = None
+            apply_profile(session, None)
+    
+    return jsonify({"device_id": device_id, "removed": removed is not None, "success": True})
+
+@app.route("/queue", methods=["GET"])
+def queue_stats():
+    device_id = request.args.get('device')
+    if device_id:
+        return jsonify({"device_id": device_id, "queue_depth": ingest_queue.depth(device_id)})
+    
+    return jsonify(ingest_queue.stats())
+
 def most_common(lst):
     if not lst:
         return None
@@ -138,22 +754,145 @@ def most_common(lst):
 
 @app.route("/data", methods=["GET"])
 def data():
-    global latest_data
-    response_data = dict(latest_data)
+    device_id = request.args.get('device')
+    if device_id:
+        session = sessions.get(device_id)
+        if session is None:
+            return jsonify({"error": f"Unknown device: {device_id}"}), 404
+    else:
+        session = sessions.most_recent()
+    
+    response_data = dict(session.latest_data) if session is not None else default_latest_data()
     response_data['server_time'] = time.time()
     return jsonify(response_data)
 
+@app.route("/events", methods=["GET"])
+def events():
+    device_id = request.args.get('device')
+    session = sessions.get(device_id) if device_id else sessions.most_recent()
+    initial = dict(session.latest_data) if session is not None else default_latest_data(device_id or DEFAULT_DEVICE_ID)
+    
+    subscriber = broadcaster.subscribe(device_id)
+    
+    def generate():
+        try:
+            yield format_event('update', initial)
+            while True:
+                try:
+                    yield subscriber.queue.get(timeout=EVENT_HEARTBEAT)
+                except queue.Empty:
+                    yield b": heartbeat\n\n"
+        finally:
+            broadcaster.unsubscribe(subscriber)
+    
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@app.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route("/devices", methods=["GET"])
+def devices():
+    sessions.evict_idle()
+    return jsonify({
+        "devices": [session.info() for session in sessions.sessions()],
+        "idle_timeout": sessions.idle_timeout,
+        "max_sessions": sessions.max_sessions,
+        "event_subscribers": broadcaster.subscriber_count()
+    })
+
+@app.route("/scheduler", methods=["GET"])
+def scheduler_stats():
+    if inference_scheduler is None:
+        return jsonify({"predictor": PREDICTOR, "enabled": False})
+    
+    stats = inference_scheduler.stats()
+    stats['predictor'] = PREDICTOR
+    stats['enabled'] = True
+    return jsonify(stats)
+
+@app.route("/model", methods=["GET"])
+def model_info():
+    from model_registry import list_versions, active_version
+    from predictor import MODEL_DIR
+    
+    return jsonify({
+        "predictor": PREDICTOR,
+        "backend": serving_backend(),
+        "version": model_version,
+        "active_version": active_version(MODEL_DIR),
+        "versions": list_versions(MODEL_DIR)
+    })
+
+@app.route("/model/reload", methods=["POST"])
+def model_reload():
+    if PREDICTOR != 'cnn':
+        return jsonify({"error": "The simple predictor has no model to reload", "success": False}), 400
+    
+    from model_registry import activate, check_version
+    from predictor import MODEL_DIR
+    
+    # ?version= loads and warms up that version, and only once it is being
+    # served makes it the active one; otherwise the active one is loaded.
+    requested = request.args.get('version')
+    if requested:
+        try:
+            check_version(MODEL_DIR, requested)
+        except ValueError as e:
+            return jsonify({"error": str(e), "success": False}), 400
+    
+    try:
+        with reload_lock:
+            version, seconds = reload_model(requested)
+            if requested:
+                activate(MODEL_DIR, version)
+    except Exception as e:
+        errors_total.inc('model_reload')
+        logger.error("Model reload failed: %s", e)
+        return jsonify({"error": str(e), "success": False}), 500
+    
+    model_reloads.inc()
+    logger.info("Now serving model version %s (loaded in %.2fs)", version, seconds)
+    return jsonify({"version": version, "seconds": seconds, "success": True})
+
+@app.route("/workers", methods=["GET"])
+def worker_stats():
+    if worker_pool is None:
+        return jsonify({"predictor": PREDICTOR, "enabled": False})
+    
+    stats = worker_pool.stats()
+    stats['predictor'] = PREDICTOR
+    stats['enabled'] = True
+    return jsonify(stats)
+
+startup_timings['server_import'] = time.perf_counter() - started_at
+
 if __name__ == "__main__":
+    if PREDICTOR == 'cnn' and INFERENCE_WORKERS > 0:
+        start_worker_pool()
+    elif PREDICTOR == 'cnn':
+        load_gesture_model()
+    
+    if PREDICTOR == 'cnn' and MODEL_POLL_INTERVAL > 0:
+        threading.Thread(target=watch_model_registry, name='model-watcher', daemon=True).start()
+    
+    logger.info("Startup: %s", ", ".join(f"{stage} {seconds:.3f}s" for stage, seconds in startup_timings.items()))
+    
     templates_dir = os.path.join(os.path.dirname(__file__), 'templates')
     os.makedirs(templates_dir, exist_ok=True)
     
-    try:
-        print("Initializing gesture detector...")
-        initialize_detector()
-        print("Gesture detector initialized successfully")
-    except Exception as e:
-        print(f"WARNING: Error initializing detector: {str(e)}")
-        print("Server will start anyway, but gesture recognition may not work")
+    print(f"Predictor: {PREDICTOR} (model backend: {serving_backend()}"
+          f"{f', {QUANTIZATION}' if serving_backend() == 'tflite' else ''}"
+          f"{f', {INFERENCE_WORKERS} workers' if INFERENCE_WORKERS > 0 else ''})")
+    print(f"Session registry: up to {MAX_SESSIONS} devices, idle timeout {SESSION_IDLE_TIMEOUT:.0f}s")
+    print(f"Ingest queue: {INGEST_WORKERS} workers, {INGEST_QUEUE_SIZE} samples per device ({INGEST_OVERFLOW})")
+    ingest_queue.start()
+    if Sock is None:
+        print("WebSocket streaming disabled - flask-sock not installed.")
+        print("To enable /stream, run: pip install flask-sock")
     
     print("Server started! Access the interface at http://localhost:5001")
     import socket
@@ -163,8 +902,8 @@ if __name__ == "__main__":
         ip_address = s.getsockname()[0]
         s.close()
         print(f"Local IP address for Arduino: {ip_address}")
-        print(f"Update Arduino with: const char* serverUrl = \"http://{ip_address}:5001/predict\";")
+        print(f"Update Arduino with: const char* serverUrl = \"http://{ip_address}:5001/predict/binary\";")
     except:
         print("Could not determine IP address")
     
-    app.run(host="0.0.0.0", port=5001)
\ No newline at end of file
+    app.run(host="0.0.0.0", port=5001, threaded=True)
\ No newline at end of file
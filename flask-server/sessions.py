@@ -0,0 +1,145 @@
+import threading
+import time
+from collections import OrderedDict, deque
+
+DEFAULT_DEVICE_ID = 'default'
+
+SENSOR_KEYS = [
+    'flex_little',
+    'flex_ring',
+    'flex_middle',
+    'flex_index',
+    'flex_thumb',
+    'quat_w',
+    'quat_x',
+    'quat_y',
+    'quat_z'
+]
+
+def default_latest_data(device_id=DEFAULT_DEVICE_ID):
+    return {
+        'device_id': device_id,
+        'flex_little': 1500,
+        'flex_ring': 1500,
+        'flex_middle': 1500,
+        'flex_index': 1500,
+        'flex_thumb': 1500,
+        'quat_w': 1.0,
+        'quat_x': 0.0,
+        'quat_y': 0.0,
+        'quat_z': 0.0,
+        'gesture_id': 0,
+        'gesture_name': 'scanning',
+        'timestamp': time.time()
+    }
+
+class DeviceSession:
+    def __init__(self, device_id, detector, history_size=10):
+        self.device_id = device_id
+        self.detector = detector
+        self.prediction_buffer = deque(maxlen=history_size)
+        self.latest_data = default_latest_data(device_id)
+        self.created_at = time.time()
+        self.last_seen = self.created_at
+        self.sample_count = 0
+        self.last_sequence = None
+        self.frames_lost = 0
+        self.frames_stale = 0
+        self.published_state = None
+        self.published_at = 0.0
+        self.profile = None
+        self.calibration_samples = None
+        self.lock = threading.Lock()
+
+    def info(self):
+        return {
+            'device_id': self.device_id,
+            'created_at': self.created_at,
+            'last_seen': self.last_seen,
+            'sample_count': self.sample_count,
+            'frames_lost': self.frames_lost,
+            'frames_stale': self.frames_stale,
+            'calibrated': self.profile is not None,
+            'calibrating': self.calibration_samples is not None,
+            'gesture_name': self.latest_data.get('gesture_name')
+        }
+
+class SessionRegistry:
+    # Sessions are kept in least-recently-seen order, so idle eviction only
+    # ever has to look at the front of the dict.
+    def __init__(self, detector_factory, idle_timeout=300.0, max_sessions=256, history_size=10, on_create=None,
+                 on_register=None):
+        self.detector_factory = detector_factory
+        self.on_create = on_create
+        self.on_register = on_register
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self.history_size = history_size
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_create(self, device_id):
+        session = self._touch(device_id)
+        if session is not None:
+            return session
+
+        # Building a detector can mean loading and warming up a model, so it
+        # happens outside the lock; if two requests race to create the same
+        # device, the first session registered wins.
+        created = DeviceSession(device_id, self.detector_factory(device_id), self.history_size)
+        if self.on_create is not None:
+            self.on_create(created)
+
+        with self._lock:
+            session = self._sessions.get(device_id)
+            if session is None:
+                session = self._sessions[device_id] = created
+            else:
+                self._sessions.move_to_end(device_id)
+            session.last_seen = time.time()
+            self._evict(session.last_seen)
+
+        # on_register sees the session once sessions() lists it too.
+        if session is created and self.on_register is not None:
+            self.on_register(session)
+        return session
+
+    def _touch(self, device_id):
+        now = time.time()
+        with self._lock:
+            session = self._sessions.get(device_id)
+            if session is not None:
+                self._sessions.move_to_end(device_id)
+                session.last_seen = now
+                self._evict(now)
+        return session
+
+    def get(self, device_id):
+        return self._sessions.get(device_id)
+
+    def most_recent(self):
+        with self._lock:
+            if not self._sessions:
+                return None
+            return next(reversed(self._sessions.values()))
+
+    def evict_idle(self):
+        with self._lock:
+            return self._evict(time.time())
+
+    def _evict(self, now):
+        evicted = 0
+        while self._sessions:
+            device_id, session = next(iter(self._sessions.items()))
+            if len(self._sessions) <= self.max_sessions and now - session.last_seen <= self.idle_timeout:
+                break
+            del self._sessions[device_id]
+            evicted += 1
+        return evicted
+
+    def sessions(self):
+        with self._lock:
+            return list(self._sessions.values())
+
+    def __len__(self):
+        return len(self._sessions)
@@ -0,0 +1,51 @@
+import os
+import sys
+
+os.environ['SPEAKLE_PREDICTOR'] = 'cnn'
+os.environ['SPEAKLE_MODEL_BACKEND'] = 'numpy'
+os.environ['SPEAKLE_STREAMING'] = '0'
+os.environ['SPEAKLE_INFERENCE_WORKERS'] = '0'
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import server
+
+SAMPLE = {
+    'device_id': 'reload-test',
+    'flex_little': 1200, 'flex_ring': 1200, 'flex_middle': 1200, 'flex_index': 1200, 'flex_thumb': 1200,
+    'quat_w': 1.0, 'quat_x': 0.0, 'quat_y': 0.0, 'quat_z': 0.0
+}
+
+def test_reloading_the_served_version_keeps_predicting():
+    client = server.app.test_client()
+    for _ in range(20):
+        assert client.post('/predict', json=SAMPLE).status_code == 200
+
+    for _ in range(2):
+        response = client.post('/model/reload')
+        assert response.status_code == 200, response.get_json()
+
+    # Enough samples that the predictor runs inference through the scheduler.
+    for _ in range(20):
+        response = client.post('/predict', json=SAMPLE)
+        assert response.status_code == 200, response.get_json()
+
+def test_reload_rejects_paths_as_versions():
+    from model_registry import active_version
+    from predictor import MODEL_DIR
+
+    before = active_version(MODEL_DIR)
+    response = server.app.test_client().post('/model/reload?version=../../saved_model')
+    assert response.status_code == 400
+    assert active_version(MODEL_DIR) == before
+
+def test_failed_reload_leaves_active_version(tmp_path, monkeypatch):
+    import predictor
+    from model_registry import active_version
+
+    # A published version with none of its files cannot be loaded.
+    os.makedirs(tmp_path / 'versions' / 'broken')
+    monkeypatch.setattr(predictor, 'MODEL_DIR', str(tmp_path))
+
+    response = server.app.test_client().post('/model/reload?version=broken')
+    assert response.status_code == 500
+    assert active_version(str(tmp_path)) is None
@@ -0,0 +1,31 @@
+import os
+import sys
+
+os.environ['SPEAKLE_PREDICTOR'] = 'cnn'
+os.environ['SPEAKLE_MODEL_BACKEND'] = 'numpy'
+os.environ['SPEAKLE_STREAMING'] = '0'
+os.environ['SPEAKLE_INFERENCE_WORKERS'] = '0'
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import server
+
+SAMPLE = {
+    'device_id': 'validation-test',
+    'flex_little': 1200, 'flex_ring': 1200, 'flex_middle': 1200, 'flex_index': 1200, 'flex_thumb': 1200,
+    'quat_w': 1.0, 'quat_x': 0.0, 'quat_y': 0.0, 'quat_z': 0.0
+}
+
+def test_malformed_sample_leaves_the_session_untouched():
+    client = server.app.test_client()
+    assert client.post('/predict', json=SAMPLE).status_code == 200
+    session = server.sessions.get('validation-test')
+    count, latest = session.sample_count, dict(session.latest_data)
+
+    for bad in ({'quat_x': 'abc'}, {'flex_thumb': [1]}, {'quat_w': float('nan')}):
+        response = client.post('/predict', json={**SAMPLE, **bad})
+        assert response.status_code == 400, response.get_json()
+        response = client.post('/ingest', json=[SAMPLE, {**SAMPLE, **bad}])
+        assert response.status_code == 400, response.get_json()
+
+    assert session.sample_count == count
+    assert session.latest_data == latest
@@ -0,0 +1,48 @@
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sessions import SessionRegistry
+
+def test_slow_detector_does_not_block_other_devices():
+    loading = threading.Event()
+    release = threading.Event()
+
+    def factory(device_id):
+        if device_id == 'slow':
+            loading.set()
+            release.wait(5)
+        return object()
+
+    registry = SessionRegistry(factory)
+    existing = registry.get_or_create('fast')
+    thread = threading.Thread(target=registry.get_or_create, args=('slow',))
+    thread.start()
+    assert loading.wait(5)
+
+    # Answered while the slow device is still building its detector.
+    assert registry.get_or_create('fast') is existing
+    assert registry.get_or_create('other') is not None
+    release.set()
+    thread.join(5)
+    assert len(registry) == 3
+
+def test_racing_creations_share_one_session():
+    barrier = threading.Barrier(4)
+
+    def factory(device_id):
+        barrier.wait(5)
+        return object()
+
+    registry = SessionRegistry(factory)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.get_or_create('glove'))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(results) == 4
+    assert all(session is results[0] for session in results)
+    assert len(registry) == 1
@@ -0,0 +1,342 @@
+import os
+import sys
+import copy
+import json
+import time
+import platform
+import argparse
+import threading
+import contextlib
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'predict_module'))
+from predictor import GestureModel, GesturePredictor
+from simple_predictor import SimpleGestureDetector
+from batch_scheduler import InferenceScheduler
+from recordings import load_dataset_recordings
+
+SERVER_DIR = os.path.join(os.path.dirname(__file__), '..', 'flask-server')
+BACKENDS = ['simple', 'keras', 'numpy', 'tflite', 'streaming', 'scheduler', 'flask']
+DEFAULT_BACKENDS = ['simple', 'numpy', 'streaming', 'scheduler', 'flask']
+SENSOR_KEYS = [
+    'flex_little', 'flex_ring', 'flex_middle', 'flex_index', 'flex_thumb',
+    'quat_w', 'quat_x', 'quat_y', 'quat_z'
+]
+
+def synthetic_samples(num_samples, seed=0):
+    rng = np.random.default_rng(seed)
+
+    flex = 1400 + np.cumsum(rng.normal(0, 15, size=(num_samples, 5)), axis=0)
+    flex = np.clip(flex, 600, 1800)
+
+    quat = np.cumsum(rng.normal(0, 0.02, size=(num_samples, 4)), axis=0)
+    quat[:, 0] += 1.0
+    quat /= np.linalg.norm(quat, axis=1, keepdims=True)
+
+    return np.concatenate([flex, quat], axis=1).astype(np.float32)
+
+def replay_samples(dataset_path, num_samples):
+    # Recorded repetitions played back to back, repeated if the dataset is
+    # shorter than the requested stream.
+    samples = np.concatenate([np.asarray(recordings.samples, dtype=np.float32)
+                              for recordings in load_dataset_recordings(dataset_path)])
+
+    repeats = int(np.ceil(num_samples / len(samples)))
+    return np.tile(samples, (repeats, 1))[:num_samples]
+
+def check_streaming(model, samples, tolerance=1e-4):
+    full = GesturePredictor(model=model)
+    streaming = GesturePredictor(model=model, streaming=True)
+
+    max_error = 0.0
+    for sample in samples:
+        full.add_sample(sample)
+        streaming.add_sample(sample)
+
+        expected = model.predict_batch(full.prepare_window()[np.newaxis])[0]
+        actual = streaming.stream.predict()
+
+        if np.argmax(expected) != np.argmax(actual):
+            raise AssertionError(f"Streaming prediction differs from full recompute at sample {full.count}")
+        max_error = max(max_error, float(np.max(np.abs(expected - actual))))
+
+    if max_error > tolerance:
+        raise AssertionError(f"Streaming output differs from full recompute by {max_error:.2e}")
+
+    return max_error
+
+def memory_usage():
+    with open('/proc/self/statm') as f:
+        rss_pages = int(f.read().split()[1])
+    return rss_pages * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+
+def set_window(detector, window):
+    # The window is what a detector looks at per prediction: the last
+    # buffer_size samples the simple detector votes over, or the max_length
+    # samples a CNN predictor runs the model on.
+    if isinstance(detector, SimpleGestureDetector):
+        if window is not None:
+            detector.buffer_size = window
+        return detector.buffer_size
+
+    if window is not None and window != detector.max_length:
+        raise ValueError(f"The served model only runs on {detector.max_length}-sample windows")
+    return detector.max_length
+
+class BenchmarkContext:
+    # Models, schedulers and the Flask app are built once per backend and
+    # shared by every stream, the way the server shares them between devices.
+    def __init__(self, model_backend):
+        self.model_backend = model_backend
+        self.models = {}
+        self.schedulers = {}
+        self.server = None
+
+    def model(self, backend, window=None):
+        # A variable-length model (train.py --variable-length) runs on any
+        # window; a fixed-length one only on the max_length it was trained for.
+        if backend not in self.models:
+            self.models[backend] = GestureModel(backend=backend)
+        model = self.models[backend]
+        if window is None or window == model.max_length:
+            return model
+        if not model.variable_length:
+            raise ValueError(f"The {backend} model only runs on {model.max_length}-sample windows; "
+                             "train it with --variable-length to benchmark other windows")
+
+        key = (backend, window)
+        if key not in self.models:
+            self.models[key] = copy.copy(model)
+            self.models[key].max_length = window
+        return self.models[key]
+
+    def scheduler(self, window):
+        if window not in self.schedulers:
+            self.schedulers[window] = InferenceScheduler(self.model(self.model_backend, window)).start()
+        return self.schedulers[window]
+
+    def stop(self):
+        for scheduler in self.schedulers.values():
+            scheduler.stop()
+
+    def predictor_factory(self, backend, window):
+        # (create, window) where create(stream_id) returns a predict function
+        # and window is the number of samples per prediction.
+        if backend == 'flask':
+            return self.flask_factory(window)
+
+        if backend == 'simple':
+            window = set_window(SimpleGestureDetector(), window)
+        elif backend in ('keras', 'numpy', 'tflite'):
+            model = self.model(backend, window)
+        elif backend == 'streaming':
+            model = self.model('numpy', window)
+        else:
+            model = self.model(self.model_backend, window)
+            scheduler = self.scheduler(window)
+
+        def create(stream_id):
+            if backend == 'simple':
+                detector = SimpleGestureDetector()
+            elif backend == 'streaming':
+                detector = GesturePredictor(model=model, streaming=True)
+            elif backend == 'scheduler':
+                detector = GesturePredictor(model=model, scheduler=scheduler)
+            else:
+                detector = GesturePredictor(model=model)
+            set_window(detector, window)
+            return detector.predict
+
+        return create, window if backend == 'simple' else model.max_length
+
+    def flask_factory(self, window):
+        if self.server is None:
+            sys.path.append(SERVER_DIR)
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                import server
+            self.server = server
+
+        # Fails here, before any stream starts, if the served model cannot
+        # run on the requested window.
+        probe = self.server.create_detector(f'benchmark-probe-{window}')
+        window = set_window(probe, window)
+
+        def create(stream_id):
+            device_id = f'benchmark-{window}-{stream_id}'
+            session = self.server.sessions.get_or_create(device_id)
+            set_window(session.detector, window)
+            client = self.server.app.test_client()
+            headers = {'X-Device-ID': device_id}
+
+            def predict(sample):
+                response = client.post('/predict', json=dict(zip(SENSOR_KEYS, sample.tolist())), headers=headers)
+                if response.status_code != 200:
+                    raise RuntimeError(f"/predict returned {response.status_code}")
+
+            return predict
+
+        return create, window
+
+def run_streams(create_predictor, samples, num_streams, warmup=20):
+    # Throughput is measured from the first stream starting its timed samples
+    # to the last one finishing, so it covers exactly the timed work.
+    latencies = [None] * num_streams
+    starts = [None] * num_streams
+    ends = [None] * num_streams
+    errors = []
+    barrier = threading.Barrier(num_streams)
+
+    def run(stream_id):
+        try:
+            predict = create_predictor(stream_id)
+            stream = np.roll(samples, stream_id * 37, axis=0)
+            for sample in stream[:warmup]:
+                predict(sample)
+
+            times = np.empty(len(stream) - warmup)
+            barrier.wait()
+            starts[stream_id] = time.perf_counter()
+            for i, sample in enumerate(stream[warmup:]):
+                start = time.perf_counter()
+                predict(sample)
+                times[i] = time.perf_counter() - start
+            ends[stream_id] = time.perf_counter()
+            latencies[stream_id] = times
+        except threading.BrokenBarrierError:
+            pass
+        except Exception as e:
+            errors.append(e)
+            barrier.abort()
+
+    threads = [threading.Thread(target=run, args=(i,), daemon=True) for i in range(num_streams)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    if errors:
+        raise errors[0]
+
+    return np.concatenate(latencies), max(ends) - min(starts)
+
+def benchmark(backend, window, create_predictor, num_streams, samples, baseline_mb):
+    # RSS is process-wide and backends run one after another, so each one is
+    # charged the growth since the baseline taken before it was created.
+    latencies, elapsed = run_streams(create_predictor, samples, num_streams)
+
+    p50, p95, p99 = np.percentile(latencies * 1e6, [50, 95, 99])
+    return {
+        'backend': backend,
+        'window': window,
+        'streams': num_streams,
+        'samples': int(len(latencies)),
+        'p50_us': float(p50),
+        'p95_us': float(p95),
+        'p99_us': float(p99),
+        'mean_us': float(latencies.mean() * 1e6),
+        'samples_per_s': float(len(latencies) / elapsed),
+        'rss_mb': memory_usage() - baseline_mb
+    }
+
+def result_key(result):
+    return (result['backend'], result['window'], result['streams'])
+
+def compare_results(results, baseline_path, tolerance):
+    with open(baseline_path) as f:
+        baseline = {result_key(result): result for result in json.load(f)['results']}
+
+    regressions = []
+    for result in results:
+        previous = baseline.get(result_key(result))
+        if previous is None:
+            continue
+        if result['p95_us'] > previous['p95_us'] * (1 + tolerance):
+            regressions.append(f"{result_key(result)}: p95 {previous['p95_us']:.1f} -> {result['p95_us']:.1f} us")
+        if result['samples_per_s'] < previous['samples_per_s'] * (1 - tolerance):
+            regressions.append(f"{result_key(result)}: throughput {previous['samples_per_s']:.0f} -> "
+                               f"{result['samples_per_s']:.0f} samples/s")
+    return regressions
+
+def print_header():
+    print(f"{'backend':<10} {'window':>6} {'streams':>7} {'p50 us':>9} {'p95 us':>9} {'p99 us':>9} "
+          f"{'samples/s':>10} {'+RSS MB':>8}")
+
+def print_result(result):
+    print(f"{result['backend']:<10} {result['window']:>6} {result['streams']:>7} "
+          f"{result['p50_us']:>9.1f} {result['p95_us']:>9.1f} {result['p99_us']:>9.1f} "
+          f"{result['samples_per_s']:>10.0f} {result['rss_mb']:>8.1f}")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark per-sample gesture inference across backends')
+    parser.add_argument('--backends', nargs='+', choices=BACKENDS, default=DEFAULT_BACKENDS)
+    parser.add_argument('--windows', type=int, nargs='+', default=[None],
+                        help='samples per prediction: the simple detector\'s buffer, or the CNN input length '
+                             '(other than the trained one, needs a --variable-length model; default: each '
+                             'backend\'s own)')
+    parser.add_argument('--streams', type=int, nargs='+', default=[1, 8], help='concurrent sample streams')
+    parser.add_argument('--samples', type=int, default=1000, help='timed samples per stream')
+    parser.add_argument('--dataset', help='replay a recording store or collected CSV instead of synthetic data')
+    parser.add_argument('--model-backend', choices=['keras', 'numpy', 'tflite'], default='numpy',
+                        help='model used by the scheduler backend')
+    parser.add_argument('--seed', type=int, default=0, help='seed for the synthetic sensor stream')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    parser.add_argument('--compare', help='baseline JSON to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='allowed relative p95 latency or throughput regression')
+    return parser.parse_args()
+
+if __name__ == '__main__':
+    args = parse_args()
+
+    num_samples = args.samples + 20
+    if args.dataset:
+        samples = replay_samples(args.dataset, num_samples)
+    else:
+        samples = synthetic_samples(num_samples, args.seed)
+
+    context = BenchmarkContext(args.model_backend)
+
+    print_header()
+    results = []
+    for backend in args.backends:
+        baseline_mb = memory_usage()
+        for window in args.windows:
+            try:
+                create_predictor, resolved_window = context.predictor_factory(backend, window)
+            except ValueError as e:
+                print(f"Skipping {backend} with a {window}-sample window: {e}")
+                continue
+            for num_streams in args.streams:
+                results.append(benchmark(backend, resolved_window, create_predictor, num_streams, samples,
+                                         baseline_mb))
+                print_result(results[-1])
+
+    context.stop()
+
+    # After the timed runs, so the model it loads is not charged to a backend.
+    if 'streaming' in args.backends:
+        max_error = check_streaming(context.model('numpy'), samples[:600])
+        print(f"Streaming check: max abs difference {max_error:.2e} from full recompute")
+
+    report = {
+        'config': vars(args),
+        'environment': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count()
+        },
+        'results': results
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results saved to {args.output}")
+
+    if args.compare:
+        regressions = compare_results(results, args.compare, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.compare}")
@@ -3,13 +3,21 @@ import csv
 import os
 import time
 import json 
+import numpy as np
 
-def collect_data(port='COM8', baudrate=115200, dataset_file='dataset_correct_format.csv'):
+from recordings import RecordingWriter, convert_csv, INDEX_FILE
+
+def collect_data(port='COM8', baudrate=115200, dataset_file='dataset_correct_format.csv', recordings_dir=None):
     person_id = 2
     gesture_name = "bye"
 
     file_exists = os.path.exists(dataset_file)
 
+    if recordings_dir and file_exists and not os.path.exists(os.path.join(recordings_dir, INDEX_FILE)):
+        # Earlier sessions only went to the CSV; start the store with them so
+        # training on the store does not lose them.
+        convert_csv(dataset_file, recordings_dir)
+
     with open(dataset_file, mode='a', newline='', encoding='utf-8') as file:
         writer = csv.writer(file, quotechar='"', quoting=csv.QUOTE_MINIMAL)
 
@@ -24,6 +32,10 @@ def collect_data(port='COM8', baudrate=115200, dataset_file='dataset_correct_for
         else:
              print(f"Appending to existing dataset file: {dataset_file}")
 
+        recordings = RecordingWriter(recordings_dir) if recordings_dir else None
+        if recordings is not None:
+            print(f"Also writing recordings to {recordings_dir}")
+
         ser = serial.Serial(port, baudrate, timeout=1)
         print(f"Opened serial port {port}. Waiting for Arduino...")
         time.sleep(3)
@@ -94,6 +106,15 @@ def collect_data(port='COM8', baudrate=115200, dataset_file='dataset_correct_for
                                 json.dumps(quatZ_list)
                             ]
                             writer.writerow(row_to_write)
+                            if recordings is not None:
+                                recordings.append(
+                                    person_id, gesture_name, repetition, time_list,
+                                    np.column_stack([
+                                        flexLittle_list, flexRing_list, flexMiddle_list,
+                                        flexIndex_list, flexThumb_list,
+                                        quatW_list, quatX_list, quatY_list, quatZ_list
+                                    ])
+                                )
                             print(f"Saved repetition {repetition} ({len(time_list)} steps)")
                             repetition += 1
                         else:
@@ -108,11 +129,14 @@ def collect_data(port='COM8', baudrate=115200, dataset_file='dataset_correct_for
 
     ser.close()
     print("Serial port closed.")
+    if recordings is not None:
+        recordings.close()
 
 if __name__ == "__main__":
     dataset_dir = os.path.join(os.path.dirname(__file__), 'dataset')
     os.makedirs(dataset_dir, exist_ok=True)
     
     dataset_path = os.path.join(dataset_dir, 'collected_data.csv')
+    recordings_dir = os.path.join(dataset_dir, 'recordings')
     
-    collect_data(dataset_file=dataset_path)
+    collect_data(dataset_file=dataset_path, recordings_dir=recordings_dir)
@@ -0,0 +1,122 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+
+class InferenceScheduler:
+    # Collects windows submitted by many streams and runs them through the
+    # model as one batch. A batch is dispatched as soon as it is full or the
+    # oldest pending window has waited max_wait_ms, whichever comes first.
+    def __init__(self, model, max_batch_size=32, max_wait_ms=5.0, stats_window=1000):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._pending = deque()
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread = None
+
+        self.batch_sizes = deque(maxlen=stats_window)
+        self.queue_latencies = deque(maxlen=stats_window)
+        self.forward_latencies = deque(maxlen=stats_window)
+        self.total_batches = 0
+        self.total_windows = 0
+
+    def start(self):
+        with self._cond:
+            if self._running:
+                return self
+            self._running = True
+
+        self._thread = threading.Thread(target=self._run, name='inference-scheduler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def submit(self, window):
+        future = Future()
+        with self._cond:
+            if not self._running:
+                raise RuntimeError("InferenceScheduler is not running")
+            self._pending.append((window, future, time.perf_counter()))
+            self._cond.notify()
+        return future
+
+    def predict(self, window, timeout=None):
+        return self.submit(window).result(timeout)
+
+    def _next_batch(self):
+        with self._cond:
+            while self._running and not self._pending:
+                self._cond.wait()
+
+            if not self._pending:
+                return []
+
+            deadline = self._pending[0][2] + self.max_wait
+            while self._running and len(self._pending) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            batch = []
+            while self._pending and len(batch) < self.max_batch_size:
+                batch.append(self._pending.popleft())
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch:
+                self._process(batch)
+            elif not self._running:
+                break
+
+    def _process(self, batch):
+        start = time.perf_counter()
+        try:
+            outputs = self.model.predict_batch(np.stack([window for window, _, _ in batch]))
+        except Exception as e:
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+        end = time.perf_counter()
+
+        for (_, future, submitted), output in zip(batch, outputs):
+            self.queue_latencies.append(start - submitted)
+            future.set_result(output)
+
+        self.forward_latencies.append(end - start)
+        self.batch_sizes.append(len(batch))
+        self.total_batches += 1
+        self.total_windows += len(batch)
+
+    def stats(self):
+        def percentiles_ms(values):
+            if not values:
+                return {'p50': None, 'p95': None, 'p99': None}
+            p50, p95, p99 = np.percentile(np.array(values) * 1000.0, [50, 95, 99])
+            return {'p50': float(p50), 'p95': float(p95), 'p99': float(p99)}
+
+        return {
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000.0,
+            'total_batches': self.total_batches,
+            'total_windows': self.total_windows,
+            'pending': len(self._pending),
+            'mean_batch_size': float(np.mean(self.batch_sizes)) if self.batch_sizes else 0.0,
+            'queue_wait_ms': percentiles_ms(list(self.queue_latencies)),
+            'forward_ms': percentiles_ms(list(self.forward_latencies))
+        }
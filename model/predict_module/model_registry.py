@@ -0,0 +1,101 @@
+import os
+import time
+import shutil
+
+# Trained models are published as immutable version directories under
+# <registry>/versions/, each holding everything a GestureModel needs
+# (weights, model_params.json, feature_scaler.joblib, label_encoder.json).
+# <registry>/ACTIVE names the version in use and is replaced atomically, so
+# readers only ever see a complete version. Without an ACTIVE file the
+# legacy layout (saved_model/ plus dataset/) is used.
+
+MODEL_FILES = (
+    'gesture_model.keras', 'gesture_model.h5', 'gesture_model.npz',
+    'gesture_model_int8.tflite', 'gesture_model_float16.tflite', 'model_params.json'
+)
+DATASET_FILES = ('feature_scaler.joblib', 'label_encoder.json')
+
+def versions_dir(registry_dir):
+    return os.path.join(registry_dir, 'versions')
+
+def list_versions(registry_dir):
+    path = versions_dir(registry_dir)
+    if not os.path.isdir(path):
+        return []
+    return sorted(name for name in os.listdir(path) if not name.startswith('.'))
+
+def active_version(registry_dir):
+    try:
+        with open(os.path.join(registry_dir, 'ACTIVE')) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+def check_version(registry_dir, version):
+    # Only names of published versions, never a path that leads elsewhere.
+    if version not in list_versions(registry_dir):
+        raise ValueError(f"Unknown model version '{version}'")
+
+def activate(registry_dir, version):
+    check_version(registry_dir, version)
+
+    tmp_path = os.path.join(registry_dir, 'ACTIVE.tmp')
+    with open(tmp_path, 'w') as f:
+        f.write(version + '\n')
+    os.replace(tmp_path, os.path.join(registry_dir, 'ACTIVE'))
+
+def resolve_model_dirs(registry_dir, dataset_dir, version=None):
+    # (model_dir, dataset_dir, version) for the given or active version.
+    version = version or active_version(registry_dir)
+    if version is None:
+        return registry_dir, dataset_dir, None
+
+    check_version(registry_dir, version)
+    version_dir = os.path.join(versions_dir(registry_dir), version)
+    return version_dir, version_dir, version
+
+def publish(registry_dir, model_dir, dataset_dir, activate_version=True):
+    # Copies the artifacts into a hidden staging directory and renames it into
+    # place, so a version directory is never seen half written.
+    version = time.strftime('%Y%m%d-%H%M%S')
+    existing = set(list_versions(registry_dir))
+    suffix = 1
+    while version in existing:
+        version = f"{time.strftime('%Y%m%d-%H%M%S')}-{suffix}"
+        suffix += 1
+
+    staging_dir = os.path.join(versions_dir(registry_dir), f'.{version}')
+    os.makedirs(staging_dir)
+    for source_dir, names in ((model_dir, MODEL_FILES), (dataset_dir, DATASET_FILES)):
+        for name in names:
+            if os.path.exists(os.path.join(source_dir, name)):
+                shutil.copy2(os.path.join(source_dir, name), os.path.join(staging_dir, name))
+    os.rename(staging_dir, os.path.join(versions_dir(registry_dir), version))
+
+    if activate_version:
+        activate(registry_dir, version)
+    return version
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='List, publish or activate gesture model versions')
+    parser.add_argument('command', choices=['list', 'publish', 'activate'])
+    parser.add_argument('version', nargs='?', help='version to activate')
+    parser.add_argument('--registry', default=os.path.join(os.path.dirname(os.path.dirname(__file__)), 'saved_model'))
+    parser.add_argument('--dataset-dir', default=os.path.join(os.path.dirname(os.path.dirname(__file__)), 'dataset'))
+    args = parser.parse_args()
+
+    if args.command == 'publish':
+        print(f"Published and activated version {publish(args.registry, args.registry, args.dataset_dir)}")
+    elif args.command == 'activate':
+        if not args.version:
+            parser.error('activate needs a version')
+        activate(args.registry, args.version)
+        print(f"Activated version {args.version}")
+    else:
+        current = active_version(args.registry)
+        for version in list_versions(args.registry):
+            print(f"{'*' if version == current else ' '} {version}")
+        if current is None:
+            print("No active version; using the files in saved_model/ and dataset/")
@@ -0,0 +1,215 @@
+import os
+import numpy as np
+
+# Forward pass of the Conv1D gesture model in plain NumPy. The weights come
+# from train.export_numpy_model: the Normalization layer is folded into the
+# convolution and each BatchNormalization into the Dense layer after it, so
+# inference is pool -> conv -> relu -> pool -> dense -> relu -> dense. Models
+# trained with global pooling average the second pool over time before the
+# Dense layer and accept windows of any length.
+
+def unpack_weights(npz_path, weights_dir):
+    # One .npy file per array, so worker processes can memory-map the weights
+    # and share a single copy through the page cache. Skipped when the files
+    # are already newer than the archive.
+    marker = os.path.join(weights_dir, 'scaler_mean.npy')
+    if os.path.exists(marker) and os.path.getmtime(marker) >= os.path.getmtime(npz_path):
+        return weights_dir
+
+    os.makedirs(weights_dir, exist_ok=True)
+    with np.load(npz_path) as data:
+        for key in data.files:
+            tmp_path = os.path.join(weights_dir, f'{key}.tmp.npy')
+            np.save(tmp_path, data[key])
+            os.replace(tmp_path, os.path.join(weights_dir, f'{key}.npy'))
+    return weights_dir
+
+def load_weights(path, mmap_mode=None):
+    if os.path.isdir(path):
+        return {
+            name[:-len('.npy')]: np.load(os.path.join(path, name), mmap_mode=mmap_mode)
+            for name in os.listdir(path)
+            if name.endswith('.npy') and not name.endswith('.tmp.npy')
+        }
+
+    with np.load(path) as data:
+        return {key: data[key] for key in data.files}
+
+def average_pool(X, pool_size):
+    length = X.shape[1] // pool_size
+    pooled = X[:, :length * pool_size].reshape(X.shape[0], length, pool_size, X.shape[2])
+    return pooled.mean(axis=2)
+
+def conv1d_same(X, kernel, bias, pad_value):
+    kernel_size = kernel.shape[0]
+    left = (kernel_size - 1) // 2
+    length = X.shape[1]
+
+    padded = np.empty((X.shape[0], length + kernel_size - 1, X.shape[2]), dtype=X.dtype)
+    padded[:, :left] = pad_value
+    padded[:, left:left + length] = X
+    padded[:, left + length:] = pad_value
+
+    out = np.empty((X.shape[0], length, kernel.shape[2]), dtype=X.dtype)
+    out[:] = bias
+    for i in range(kernel_size):
+        out += padded[:, i:i + length] @ kernel[i]
+    return out
+
+def relu(X):
+    return np.maximum(X, 0, out=X)
+
+def softmax(X):
+    X = X - X.max(axis=-1, keepdims=True)
+    np.exp(X, out=X)
+    X /= X.sum(axis=-1, keepdims=True)
+    return X
+
+class NumpyModel:
+    # path is an .npz archive or a directory from unpack_weights(); with
+    # mmap_mode='r' the float32 weights stay memory-mapped instead of copied.
+    def __init__(self, path, dtype=np.float32, mmap_mode=None):
+        weights = load_weights(path, mmap_mode)
+
+        self.dtype = dtype
+        self.scaler_mean = np.asarray(weights['scaler_mean'], dtype=dtype)
+        self.scaler_scale = np.asarray(weights['scaler_scale'], dtype=dtype)
+        self.input_pool = int(weights['input_pool'])
+        self.conv_kernel = np.asarray(weights['conv_kernel'], dtype=dtype)
+        self.conv_bias = np.asarray(weights['conv_bias'], dtype=dtype)
+        self.conv_pad_value = np.asarray(weights['conv_pad_value'], dtype=dtype)
+        self.conv_pool = int(weights['conv_pool'])
+        self.global_pool = bool(weights['global_pool']) if 'global_pool' in weights else False
+        self.dense_kernel = np.asarray(weights['dense_kernel'], dtype=dtype)
+        self.dense_bias = np.asarray(weights['dense_bias'], dtype=dtype)
+        self.output_kernel = np.asarray(weights['output_kernel'], dtype=dtype)
+        self.output_bias = np.asarray(weights['output_bias'], dtype=dtype)
+
+    def conv_features(self, X):
+        X = np.asarray(X, dtype=self.dtype)
+        pooled = average_pool(X, self.input_pool)
+        hidden = relu(conv1d_same(pooled, self.conv_kernel, self.conv_bias, self.conv_pad_value))
+        return average_pool(hidden, self.conv_pool)
+
+    def classify(self, features):
+        hidden = relu(features @ self.dense_kernel + self.dense_bias)
+        return softmax(hidden @ self.output_kernel + self.output_bias)
+
+    def predict_batch(self, X):
+        features = self.conv_features(X)
+        if self.global_pool:
+            return self.classify(features.mean(axis=1))
+        return self.classify(features.reshape(features.shape[0], -1))
+
+    def create_stream(self, max_length):
+        return StreamingState(self, max_length)
+
+class StreamingState:
+    # Incremental evaluation of NumpyModel over a sliding window of max_length
+    # samples. Conv outputs whose receptive field lies inside the window only
+    # depend on absolute sample positions, so they are computed once when
+    # their last input arrives and cached. Per sample this costs one pooled
+    # value, one conv position and the few border positions affected by the
+    # window's 'same' padding; the position-dependent Dense layers are then
+    # evaluated on the cached activations.
+    def __init__(self, model, max_length):
+        self.model = model
+        self.max_length = max_length
+        self.pool = model.input_pool
+        self.kernel_size = model.conv_kernel.shape[0]
+        self.left = (self.kernel_size - 1) // 2
+        self.right = self.kernel_size - 1 - self.left
+        self.pooled_length = max_length // self.pool
+
+        if self.pooled_length <= self.kernel_size:
+            raise ValueError(f"Window of {max_length} samples is too short for streaming inference")
+
+        num_features = model.conv_kernel.shape[1]
+        channels = model.conv_kernel.shape[2]
+        self.flat_kernel = model.conv_kernel.reshape(-1, channels)
+
+        # Caches are indexed by the absolute index of a pool's first sample and
+        # written twice, size rows apart, so every read is a strided view.
+        self.size = max_length + self.pool * self.kernel_size
+        self.pooled = np.zeros((2 * self.size, num_features), dtype=model.dtype)
+        self.conv = np.empty((2 * self.size, channels), dtype=model.dtype)
+        self.conv[:] = model.conv_bias
+        self.recent = np.zeros((self.pool, num_features), dtype=model.dtype)
+        self.t = -1
+
+        # Border positions read the first and last `border` pooled values of the
+        # window; index 2 * border selects the padding row instead.
+        border = self.left + self.right
+        self.border_inputs = np.empty((2 * border + 1, num_features), dtype=model.dtype)
+        self.border_inputs[-1] = model.conv_pad_value
+        positions = list(range(self.left)) + list(range(self.pooled_length - self.right, self.pooled_length))
+        self.border_index = np.empty((border, self.kernel_size), dtype=np.intp)
+        for row, position in enumerate(positions):
+            for k in range(self.kernel_size):
+                j = position + k - self.left
+                if j < 0 or j >= self.pooled_length:
+                    self.border_index[row, k] = 2 * border
+                elif j < border:
+                    self.border_index[row, k] = j
+                else:
+                    self.border_index[row, k] = j - (self.pooled_length - 2 * border)
+
+        # The second average pooling is linear, so it is folded into the Dense
+        # kernel, which then reads the unpooled conv activations directly.
+        # Global pooling is one more average, over all pooled positions.
+        conv_pool = model.conv_pool
+        used = (self.pooled_length // conv_pool) * conv_pool
+        dense_kernel = model.dense_kernel
+        if model.global_pool:
+            dense_kernel = np.broadcast_to(dense_kernel / (used // conv_pool), (used // conv_pool,) + dense_kernel.shape)
+        dense_kernel = dense_kernel.reshape(used // conv_pool, 1, channels, -1)
+        dense_kernel = np.broadcast_to(dense_kernel / conv_pool, (used // conv_pool, conv_pool, channels, dense_kernel.shape[-1]))
+        self.dense_kernel = np.zeros((self.pooled_length, channels, dense_kernel.shape[-1]), dtype=model.dtype)
+        self.dense_kernel[:used] = dense_kernel.reshape(used, channels, -1)
+        self.dense_kernel = self.dense_kernel.reshape(self.pooled_length * channels, -1)
+        self.hidden = np.empty((self.pooled_length, channels), dtype=model.dtype)
+
+    def _store(self, cache, index, value):
+        i = index % self.size
+        cache[i] = value
+        cache[i + self.size] = value
+
+    def _view(self, cache, index, count):
+        i = index % self.size
+        return cache[i:i + self.pool * (count - 1) + 1:self.pool]
+
+    def push(self, sample):
+        self.t += 1
+        self.recent[self.t % self.pool] = sample
+
+        start = self.t - self.pool + 1
+        self._store(self.pooled, start, np.add.reduce(self.recent, axis=0) / self.pool)
+
+        # The newest conv position whose inputs are now all known.
+        index = start - self.pool * self.right
+        taps = self._view(self.pooled, index - self.pool * self.left, self.kernel_size)
+        self._store(self.conv, index, self.model.conv_bias + taps.reshape(-1) @ self.flat_kernel)
+
+    def conv_features(self):
+        first = self.t - self.max_length + 1
+        length = self.pooled_length
+        border = self.left + self.right
+
+        hidden = self.hidden
+        hidden[self.left:length - self.right] = self._view(self.conv, first + self.pool * self.left, length - border)
+
+        self.border_inputs[:border] = self._view(self.pooled, first, border)
+        self.border_inputs[border:2 * border] = self._view(self.pooled, first + self.pool * (length - border), border)
+        taps = self.border_inputs[self.border_index].reshape(border, -1)
+        edges = self.model.conv_bias + taps @ self.flat_kernel
+        hidden[:self.left] = edges[:self.left]
+        hidden[length - self.right:] = edges[self.left:]
+
+        return relu(hidden)
+
+    def predict(self):
+        model = self.model
+        dense = relu(self.conv_features().reshape(-1) @ self.dense_kernel + model.dense_bias)
+        logits = dense @ model.output_kernel + model.output_bias
+        exp = np.exp(logits - logits.max())
+        return exp / exp.sum()
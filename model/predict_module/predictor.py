@@ -1,14 +1,41 @@
 import os
 import json
+import time
+import threading
 import numpy as np
-from tensorflow.keras.models import load_model
-import pandas as pd
-from joblib import load
+from collections import deque
 
-class GesturePredictor:
-    def __init__(self):
-        model_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'saved_model')
-        dataset_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'dataset')
+MODEL_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'saved_model')
+DATASET_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'dataset')
+
+BACKENDS = ('keras', 'numpy', 'tflite')
+
+# Models loaded by get_model(), shared by every predictor in the process.
+_models = {}
+_models_lock = threading.Lock()
+
+def load_keras_model(model_dir):
+    from tensorflow.keras.models import load_model
+    
+    try:
+        return load_model(os.path.join(model_dir, 'gesture_model.keras'))
+    except ValueError as e:
+        # A Normalization layer that was never adapted is saved without its
+        # variables and cannot be restored from the .keras archive, while the
+        # best-epoch .h5 checkpoint written during training still loads.
+        print(f"WARNING: Could not load gesture_model.keras ({e}), using gesture_model.h5")
+        return load_model(os.path.join(model_dir, 'gesture_model.h5'))
+
+class GestureModel:
+    def __init__(self, backend='keras', model_dir=MODEL_DIR, dataset_dir=DATASET_DIR, quantization='int8', mmap=False,
+                 version=None):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend '{backend}', expected one of {BACKENDS}")
+        
+        start = time.perf_counter()
+        self.backend = backend
+        self.version = version
+        self.quantization = quantization if backend == 'tflite' else None
         
         with open(os.path.join(model_dir, 'model_params.json'), 'r') as f:
             self.model_params = json.load(f)
@@ -16,52 +43,266 @@ class GesturePredictor:
         with open(os.path.join(dataset_dir, 'label_encoder.json'), 'r') as f:
             self.class_mapping = json.load(f)['classes']
         
-        self.model = load_model(os.path.join(model_dir, 'gesture_model.keras'))
         self.max_length = self.model_params['max_length']
-        self.scaler = load(os.path.join(dataset_dir, 'feature_scaler.joblib'))
+        self.num_features = self.model_params['num_features']
+        self.variable_length = self.model_params.get('variable_length', False)
+        
+        if backend in ('keras', 'tflite'):
+            from joblib import load
+            
+            if backend == 'keras':
+                self.model = load_keras_model(model_dir)
+            else:
+                from tflite_backend import TFLiteModel, QUANTIZATIONS
+                
+                if quantization not in QUANTIZATIONS:
+                    raise ValueError(f"Unknown quantization '{quantization}', expected one of {QUANTIZATIONS}")
+                self.model = TFLiteModel(os.path.join(model_dir, f'gesture_model_{quantization}.tflite'))
+            
+            scaler = load(os.path.join(dataset_dir, 'feature_scaler.joblib'))
+            self.scaler_mean = np.asarray(scaler.mean_, dtype=np.float32)
+            self.scaler_scale = np.asarray(scaler.scale_, dtype=np.float32)
+        else:
+            from numpy_backend import NumpyModel, unpack_weights
+            
+            weights_path = os.path.join(model_dir, 'gesture_model.npz')
+            if mmap:
+                weights_path = unpack_weights(weights_path, os.path.join(model_dir, 'gesture_model_weights'))
+            self.model = NumpyModel(weights_path, mmap_mode='r' if mmap else None)
+            self.scaler_mean = self.model.scaler_mean
+            self.scaler_scale = self.model.scaler_scale
+        
+        self.load_seconds = time.perf_counter() - start
+        self.warm_up_seconds = 0.0
+        
+    def warm_up(self, batch_sizes=(1,)):
+        # The first call for each batch shape traces the Keras graph or
+        # allocates the TFLite tensors; do it before real requests arrive.
+        start = time.perf_counter()
+        for batch_size in batch_sizes:
+            self.predict_batch(np.zeros((batch_size, self.max_length, self.num_features), dtype=np.float32))
+        if self.backend == 'numpy':
+            stream = self.create_stream()
+            stream.push(np.zeros(self.num_features, dtype=np.float32))
+            stream.predict()
+        self.warm_up_seconds = time.perf_counter() - start
+        return self.warm_up_seconds
+        
+    def transform(self, X):
+        return (X - self.scaler_mean) / self.scaler_scale
+        
+    def create_stream(self):
+        if self.backend != 'numpy':
+            raise ValueError("Streaming inference requires the numpy backend")
+        
+        return self.model.create_stream(self.max_length)
+        
+    def predict_batch(self, X):
+        if self.backend == 'keras':
+            if X.shape[1] != self.max_length:
+                # predict_on_batch would retrace its graph for every new length.
+                return np.asarray(self.model(X, training=False))
+            return np.asarray(self.model.predict_on_batch(X))
+        
+        return self.model.predict_batch(X)
+
+def get_model(backend='keras', model_dir=None, dataset_dir=None, quantization='int8', warm_up_batch_sizes=(1,),
+              version=None):
+    # Without explicit directories, the active (or given) registry version.
+    if model_dir is None:
+        from model_registry import resolve_model_dirs
+        
+        model_dir, dataset_dir, version = resolve_model_dirs(MODEL_DIR, DATASET_DIR, version)
+    
+    key = (backend, model_dir, dataset_dir or DATASET_DIR, quantization)
+    with _models_lock:
+        model = _models.get(key)
+        if model is None:
+            model = GestureModel(backend, model_dir, dataset_dir or DATASET_DIR, quantization, version=version)
+            if warm_up_batch_sizes:
+                model.warm_up(warm_up_batch_sizes)
+            _models[key] = model
+    return model
+
+def discard_model(model):
+    with _models_lock:
+        for key in [key for key, cached in _models.items() if cached is model]:
+            del _models[key]
+
+class GesturePredictor:
+    def __init__(self, model=None, scheduler=None, backend='keras', streaming=False,
+                 motion_threshold=None, motion_hysteresis=0.5, max_skip=50):
+        if model is None:
+            model = get_model(backend)
         
-        self.buffer = []
+        self.model = model
+        self.scheduler = scheduler
+        self.streaming = streaming
+        self.model_params = model.model_params
+        self.class_mapping = model.class_mapping
+        self.max_length = model.max_length
+        self.num_features = model.num_features
+        self.gesture_names = {-1: 'collecting_data', 0: 'scanning'}
+        for i, name in enumerate(self.class_mapping):
+            self.gesture_names[i + 1] = name
+        
+        # Scaled samples are written twice, max_length apart, so the latest
+        # window is always the contiguous slice starting at self.position.
+        # Unfilled rows stay zero, which is the padding the model expects.
+        self.window = np.zeros((2 * self.max_length, self.num_features), dtype=np.float32)
+        self.position = 0
+        self.count = 0
+        self.stream = model.create_stream() if streaming else None
         self.buffer_size = 15
-        self.prediction_history = []
         self.prediction_window = 5
+        self.prediction_history = deque(maxlen=self.prediction_window)
         self.confidence_threshold = 0.85
+        self.last_timings = {}
+        
+        # Motion gate, off unless motion_threshold is set. Inference is skipped
+        # and the previous output reused while the hand is at rest: a resting
+        # hand has to move motion_threshold (in scaled units, on any channel)
+        # away from the last inferred sample to wake the model, and a moving
+        # one rests again once a sample changes by less than
+        # motion_threshold * motion_hysteresis. The model still runs at least
+        # every max_skip samples, as the window keeps sliding regardless.
+        self.motion_threshold = motion_threshold
+        self.motion_hysteresis = motion_hysteresis
+        self.max_skip = max_skip
+        self.last_inferred = np.zeros(self.num_features, dtype=np.float32)
+        self.last_output = None
+        self.moving = True
+        self.skip_run = 0
+        self.inferences = 0
+        self.skipped = 0
         
     def add_sample(self, sample):
-        self.buffer.append(sample)
+        start = time.perf_counter()
+        scaled = self.model.transform(np.asarray(sample, dtype=np.float32))
+        scaled_at = time.perf_counter()
+        
+        self.buffer_scaled(scaled)
+        
+        self.last_timings['scale'] = scaled_at - start
+        self.last_timings['buffer'] = time.perf_counter() - scaled_at
+        
+    def buffer_scaled(self, scaled):
+        self.window[self.position] = scaled
+        self.window[self.position + self.max_length] = scaled
+        self.position = (self.position + 1) % self.max_length
+        self.count = min(self.count + 1, self.max_length)
+        
+        if self.stream is not None:
+            self.stream.push(scaled)
+            
+    def set_model(self, model, scheduler=None):
+        # Adopts another model version without losing the stream: buffered
+        # samples are mapped back through the old scaler and rescaled with the
+        # new one, the newest of them kept up to the new max_length, and the
+        # streaming state is rebuilt from them.
+        if model.num_features != self.num_features:
+            raise ValueError(f"New model expects {model.num_features} features, not {self.num_features}")
+        
+        recent = self.prepare_window()[self.max_length - self.count:]
+        raw = recent * self.model.scaler_scale + self.model.scaler_mean
+        rescaled = model.transform(raw[max(0, len(raw) - model.max_length):])
+        
+        if model.class_mapping != self.class_mapping:
+            self.prediction_history.clear()
+        
+        self.model = model
+        if scheduler is not None:
+            self.scheduler = scheduler
+        self.model_params = model.model_params
+        self.class_mapping = model.class_mapping
+        self.max_length = model.max_length
+        self.gesture_names = {-1: 'collecting_data', 0: 'scanning'}
+        for i, name in enumerate(self.class_mapping):
+            self.gesture_names[i + 1] = name
+        
+        self.window = np.zeros((2 * self.max_length, self.num_features), dtype=np.float32)
+        self.position = 0
+        self.count = 0
+        self.stream = model.create_stream() if self.streaming else None
+        for scaled in rescaled:
+            self.buffer_scaled(scaled)
+        
+        self.last_output = None
+        self.moving = True
+        self.skip_run = 0
+        
+    def reset(self):
+        self.window.fill(0)
+        self.position = 0
+        self.count = 0
+        self.stream = self.model.create_stream() if self.streaming else None
+        self.prediction_history.clear()
+        self.last_output = None
+        self.moving = True
+        self.skip_run = 0
+        
+    def prepare_window(self):
+        return self.window[self.position:self.position + self.max_length]
+        
+    def motion_detected(self):
+        if self.motion_threshold is None or self.last_output is None:
+            return True
+        
+        latest = self.window[self.position - 1 + self.max_length]
+        delta = float(np.max(np.abs(latest - self.last_inferred)))
+        threshold = self.motion_threshold * self.motion_hysteresis if self.moving else self.motion_threshold
+        self.moving = delta >= threshold
+        return self.moving or self.skip_run >= self.max_skip
+        
+    @property
+    def skip_ratio(self):
+        total = self.inferences + self.skipped
+        return self.skipped / total if total else 0.0
+        
+    def infer(self, window):
+        if self.scheduler is not None:
+            return self.scheduler.predict(window)
+        
+        return self.model.predict_batch(window.reshape(1, *window.shape))[0]
         
-        if len(self.buffer) > self.max_length:
-            self.buffer = self.buffer[-self.max_length:]
-    
     def predict(self, sample=None):
+        self.last_timings = {}
         if sample is not None:
             self.add_sample(sample)
         
-        if len(self.buffer) < self.buffer_size:
+        if self.count < self.buffer_size:
             return -1
         
-        X = np.array(self.buffer)
-        
-        X_reshaped = X.reshape(-1, X.shape[1])
-        X_scaled = self.scaler.transform(X_reshaped)
-        X_scaled = X_scaled.reshape(X.shape)
-        
-        if len(X_scaled) < self.max_length:
-            padded = np.zeros((self.max_length, X_scaled.shape[1]))
-            padded[-len(X_scaled):] = X_scaled
-            X_scaled = padded
+        start = time.perf_counter()
+        if not self.motion_detected():
+            y_pred = self.last_output
+            self.skip_run += 1
+            self.skipped += 1
         else:
-            X_scaled = X_scaled[-self.max_length:]
+            if self.model.variable_length and self.count < self.max_length:
+                # Until the window fills up, only the samples received so far.
+                window = self.prepare_window()[self.max_length - self.count:]
+                y_pred = self.model.predict_batch(window.reshape(1, *window.shape))[0]
+            elif self.stream is not None:
+                y_pred = self.stream.predict()
+            else:
+                y_pred = self.infer(self.prepare_window())
+            self.last_output = y_pred
+            self.last_inferred[:] = self.window[self.position - 1 + self.max_length]
+            self.skip_run = 0
+            self.inferences += 1
+        forward_at = time.perf_counter()
         
-        X_scaled = X_scaled.reshape(1, self.max_length, X_scaled.shape[1])
-        
-        y_pred = self.model.predict(X_scaled, verbose=0)[0]
+        prediction = self.update_prediction(y_pred)
+        self.last_timings['forward'] = forward_at - start
+        self.last_timings['smoothing'] = time.perf_counter() - forward_at
+        return prediction
         
+    def update_prediction(self, y_pred):
         pred_class = np.argmax(y_pred)
         confidence = y_pred[pred_class]
         
         self.prediction_history.append((pred_class, confidence))
-        if len(self.prediction_history) > self.prediction_window:
-            self.prediction_history.pop(0)
         
         if len(self.prediction_history) == self.prediction_window:
             pred_counts = {}
@@ -83,7 +324,7 @@ class GesturePredictor:
                 return 0
             
             return most_common_class + 1
-            
+        
         if confidence < self.confidence_threshold:
             return 0
         
@@ -118,4 +359,4 @@ def predict_gesture(sensor_data):
     features = parse_sensor_data(sensor_data)
     prediction = gesture_predictor.predict(features)
     
-    return prediction 
\ No newline at end of file
+    return prediction
@@ -1,61 +1,170 @@
+import numpy as np
+
+GESTURE_NAMES = {
+    -1: "collecting_data",
+    0: "scanning",
+    1: "hello",
+    2: "my_name_is",
+    3: "bye"
+}
+
+FLEX_THRESHOLD = 1200
+NUM_FINGERS = 5
+NUM_GESTURES = 4
+
+# Bit i of a pattern is set when finger i of the sample (little, ring, middle,
+# index, thumb) is bent. Every pattern not listed maps to 0 (scanning).
+GESTURE_PATTERNS = {
+    3: 0b11111,  # bye: every finger bent
+    1: 0b11000,  # hello: thumb and index bent
+    2: 0b10011   # my_name_is: thumb, ring and little bent
+}
+
+GESTURE_LUT = np.zeros(2 ** NUM_FINGERS, dtype=np.int8)
+for gesture_id, pattern in GESTURE_PATTERNS.items():
+    GESTURE_LUT[pattern] = gesture_id
+GESTURE_TABLE = GESTURE_LUT.tolist()
+
+def finger_thresholds(thresholds=None):
+    if thresholds is None:
+        thresholds = FLEX_THRESHOLD
+    return np.broadcast_to(np.asarray(thresholds, dtype=np.float32), (NUM_FINGERS,)).copy()
+
+def classify_samples(samples, thresholds=None):
+    # Gesture id of every sample in an (..., 9) array, via the bent-finger bits.
+    samples = np.asarray(samples, dtype=np.float32)
+    bent = samples[..., :NUM_FINGERS] < finger_thresholds(thresholds)
+    bits = np.packbits(bent, axis=-1, bitorder='little')[..., 0]
+    return GESTURE_LUT[bits]
+
+def vote(counts, count_threshold):
+    # Most common gesture per row, ties going to the lowest id, or 0 when it
+    # does not appear at least count_threshold times.
+    best = counts.argmax(axis=-1)
+    best_count = np.take_along_axis(counts, best[..., np.newaxis], axis=-1)[..., 0]
+    return np.where(best_count >= count_threshold, best, 0)
+
 class SimpleGestureDetector:
-    def __init__(self):
-        self.flex_threshold = 1200
-        self.buffer = []
-        self.buffer_size = 5
-        self.gesture_counts = {0: 0, 1: 0, 2: 0, 3: 0}
-        self.count_threshold = 3
+    # Each sample is classified once when it arrives, and the gesture ids of
+    # the last buffer_size samples are kept in a ring with running counts, so
+    # predict() is a constant-time vote regardless of the buffer size.
+    def __init__(self, thresholds=None, buffer_size=5, count_threshold=3):
+        self.gesture_names = GESTURE_NAMES
+        self.thresholds = thresholds
+        self.count_threshold = count_threshold
+        self.buffer_size = buffer_size
         
-    def add_sample(self, sample):
-        self.buffer.append(sample)
-        if len(self.buffer) > self.buffer_size:
-            self.buffer.pop(0)
-    
-    def is_finger_bent(self, value):
-        return value < self.flex_threshold
-    
-    def get_gesture_from_pattern(self, fingers_bent):
-        thumb_bent, index_bent, middle_bent, ring_bent, little_bent = fingers_bent
+    @property
+    def thresholds(self):
+        return self._thresholds
         
-        if thumb_bent and index_bent and middle_bent and ring_bent and little_bent:
-            return 3
+    @thresholds.setter
+    def thresholds(self, thresholds):
+        self._thresholds = finger_thresholds(thresholds)
+        self._threshold_list = self._thresholds.tolist()
         
-        if thumb_bent and index_bent and not middle_bent and not ring_bent and not little_bent:
-            return 1
-            
-        if thumb_bent and not index_bent and not middle_bent and ring_bent and little_bent:
-            return 2
+    @property
+    def buffer_size(self):
+        return len(self.codes)
+        
+    @buffer_size.setter
+    def buffer_size(self, size):
+        self.codes = np.zeros(size, dtype=np.int8)
+        self.reset()
+        
+    def reset(self):
+        self.counts = np.zeros(NUM_GESTURES, dtype=np.int64)
+        self.position = 0
+        self.filled = 0
+        
+    def classify(self, sample):
+        # A single sample is cheaper to pack in plain Python than through NumPy.
+        bits = 0
+        for finger, threshold in enumerate(self._threshold_list):
+            if sample[finger] < threshold:
+                bits |= 1 << finger
+        return GESTURE_TABLE[bits]
+        
+    def add_sample(self, sample):
+        self.push(self.classify(sample))
+        
+    def add_samples(self, samples):
+        for gesture in classify_samples(samples, self.thresholds)[-len(self.codes):]:
+            self.push(gesture)
             
-        return 0
-    
+    def push(self, gesture):
+        if self.filled == len(self.codes):
+            self.counts[self.codes[self.position]] -= 1
+        else:
+            self.filled += 1
+        
+        self.codes[self.position] = gesture
+        self.counts[gesture] += 1
+        self.position = (self.position + 1) % len(self.codes)
+        
     def predict(self, sample=None):
         if sample is not None:
             self.add_sample(sample)
-            
-        if len(self.buffer) < self.buffer_size:
+        
+        if self.filled < len(self.codes):
             return -1
-            
-        current_gestures = []
-        for sample in self.buffer:
-            thumb_bent = self.is_finger_bent(sample[4])
-            index_bent = self.is_finger_bent(sample[3])
-            middle_bent = self.is_finger_bent(sample[2])
-            ring_bent = self.is_finger_bent(sample[1])
-            little_bent = self.is_finger_bent(sample[0])
-            
-            gesture = self.get_gesture_from_pattern([thumb_bent, index_bent, middle_bent, ring_bent, little_bent])
-            current_gestures.append(gesture)
-            
-        counts = {0: 0, 1: 0, 2: 0, 3: 0}
-        for gesture in current_gestures:
-            counts[gesture] = counts.get(gesture, 0) + 1
-            
-        most_common_gesture = max(counts, key=counts.get)
         
-        if counts[most_common_gesture] >= self.count_threshold:
+        most_common_gesture = int(self.counts.argmax())
+        
+        if self.counts[most_common_gesture] >= self.count_threshold:
             return most_common_gesture
         
         return 0
+        
+    def predict_windows(self, windows):
+        # Decision for each window of an (N, T, 9) array, as if its samples
+        # had been streamed through a fresh detector.
+        windows = np.asarray(windows)
+        if windows.shape[1] < len(self.codes):
+            return np.full(len(windows), -1, dtype=np.int64)
+        
+        gestures = classify_samples(windows[:, -len(self.codes):], self.thresholds)
+        counts = np.stack([(gestures == g).sum(axis=1) for g in range(NUM_GESTURES)], axis=1)
+        return vote(counts, self.count_threshold)
+
+class SimpleGestureDetectorBank:
+    # Many gloves' detectors held as rows of shared arrays, so one call
+    # classifies and votes for the latest sample of every stream at once.
+    def __init__(self, num_streams, thresholds=None, buffer_size=5, count_threshold=3):
+        self.gesture_names = GESTURE_NAMES
+        self.thresholds = finger_thresholds(thresholds)
+        self.buffer_size = buffer_size
+        self.count_threshold = count_threshold
+        
+        self.codes = np.zeros((num_streams, buffer_size), dtype=np.int8)
+        self.counts = np.zeros((num_streams, NUM_GESTURES), dtype=np.int64)
+        self.positions = np.zeros(num_streams, dtype=np.int64)
+        self.filled = np.zeros(num_streams, dtype=np.int64)
+        
+    def reset(self, streams=None):
+        streams = slice(None) if streams is None else streams
+        self.counts[streams] = 0
+        self.positions[streams] = 0
+        self.filled[streams] = 0
+        
+    def predict(self, samples, streams=None):
+        # samples is (S, 9): one new sample for each of the given streams,
+        # which must not repeat within a call (all streams by default).
+        streams = np.arange(len(self.codes)) if streams is None else np.asarray(streams)
+        gestures = classify_samples(samples, self.thresholds)
+        positions = self.positions[streams]
+        
+        full = self.filled[streams] == self.buffer_size
+        self.counts[streams[full], self.codes[streams[full], positions[full]]] -= 1
+        
+        self.codes[streams, positions] = gestures
+        self.counts[streams, gestures] += 1
+        self.positions[streams] = (positions + 1) % self.buffer_size
+        self.filled[streams] = np.minimum(self.filled[streams] + 1, self.buffer_size)
+        
+        predictions = vote(self.counts[streams], self.count_threshold)
+        predictions[self.filled[streams] < self.buffer_size] = -1
+        return predictions
 
 
 def parse_sensor_data(data):
@@ -86,4 +195,4 @@ def predict_gesture(sensor_data):
     features = parse_sensor_data(sensor_data)
     prediction = gesture_detector.predict(features)
     
-    return prediction 
\ No newline at end of file
+    return prediction
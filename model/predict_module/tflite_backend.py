@@ -0,0 +1,40 @@
+import threading
+import numpy as np
+
+# Runs a TFLite export of the gesture model (see train.export_tflite_model).
+# The lightweight tflite_runtime package is used when installed, so edge
+# boxes do not need full TensorFlow; otherwise TensorFlow's own interpreter.
+
+QUANTIZATIONS = ('int8', 'float16')
+
+def load_interpreter(path, num_threads=None):
+    try:
+        from tflite_runtime.interpreter import Interpreter
+    except ImportError:
+        import tensorflow as tf
+        Interpreter = tf.lite.Interpreter
+
+    return Interpreter(model_path=path, num_threads=num_threads)
+
+class TFLiteModel:
+    def __init__(self, path, num_threads=None):
+        self.path = path
+        self.interpreter = load_interpreter(path, num_threads)
+        self.input_index = self.interpreter.get_input_details()[0]['index']
+        self.output_index = self.interpreter.get_output_details()[0]['index']
+        self.input_shape = None
+        # An interpreter holds its tensors internally and cannot run two
+        # invocations at once.
+        self.lock = threading.Lock()
+
+    def predict_batch(self, X):
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        with self.lock:
+            if X.shape != self.input_shape:
+                self.interpreter.resize_tensor_input(self.input_index, X.shape)
+                self.interpreter.allocate_tensors()
+                self.input_shape = X.shape
+
+            self.interpreter.set_tensor(self.input_index, X)
+            self.interpreter.invoke()
+            return self.interpreter.get_tensor(self.output_index).copy()
@@ -0,0 +1,268 @@
+import os
+import time
+import hashlib
+import json
+import threading
+import multiprocessing
+from concurrent.futures import Future
+
+import numpy as np
+
+MODEL_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'saved_model')
+DATASET_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'dataset')
+
+def device_worker(device_id, num_workers):
+    # Stable across processes and restarts, unlike hash() of a str, and well
+    # mixed, unlike crc32, which keeps ids like glove-1, glove-2 together.
+    digest = hashlib.blake2b(device_id.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little') % num_workers
+
+def run_worker(worker_id, model_dir, dataset_dir, options, requests, results, idle_timeout):
+    # Each worker memory-maps the same unpacked weights and keeps the
+    # GesturePredictor of every device routed to it, so a glove's window and
+    # streaming state never leave the process that owns them.
+    from predictor import GestureModel, GesturePredictor
+
+    model = GestureModel('numpy', model_dir, dataset_dir, mmap=True)
+    model.warm_up()
+    results.put((None, worker_id, None))
+
+    predictors = {}
+    last_used = {}
+    last_evicted = time.monotonic()
+
+    while True:
+        message = requests.get()
+        if message is None:
+            break
+
+        request_id, device_id, samples = message
+        try:
+            if device_id is None:
+                # A new model version: (model_dir, dataset_dir, version).
+                model_dir, dataset_dir, version = samples
+                model = GestureModel('numpy', model_dir, dataset_dir, mmap=True, version=version)
+                model.warm_up()
+                for predictor in predictors.values():
+                    predictor.set_model(model)
+                results.put((request_id, None, None))
+                continue
+
+            predictor = predictors.get(device_id)
+            if predictor is None:
+                predictor = predictors[device_id] = GesturePredictor(model=model, **options)
+            last_used[device_id] = time.monotonic()
+
+            if samples is None:
+                predictor.reset()
+                result = None
+            else:
+                for sample in samples[:-1]:
+                    predictor.add_sample(sample)
+                result = (int(predictor.predict(samples[-1])), predictor.last_timings)
+            results.put((request_id, result, None))
+        except Exception as e:
+            results.put((request_id, None, f"{type(e).__name__}: {e}"))
+
+        now = time.monotonic()
+        if now - last_evicted > idle_timeout / 10:
+            last_evicted = now
+            for idle_device in [d for d, used in last_used.items() if now - used > idle_timeout]:
+                del predictors[idle_device], last_used[idle_device]
+
+class RemotePredictor:
+    # Stands in for a GesturePredictor living in a worker process. Samples
+    # added without a prediction are held back and sent along with the next
+    # predict() call, so each call is one round trip.
+    def __init__(self, pool, device_id):
+        self.pool = pool
+        self.device_id = device_id
+        self.pending = []
+        self.last_timings = {}
+
+    @property
+    def gesture_names(self):
+        return self.pool.gesture_names
+
+    def add_sample(self, sample):
+        self.pending.append(np.asarray(sample, dtype=np.float32))
+
+    def predict(self, sample=None):
+        if sample is not None:
+            self.add_sample(sample)
+        samples, self.pending = self.pending, []
+        prediction, self.last_timings = self.pool.submit(self.device_id, samples).result(self.pool.timeout)
+        return prediction
+
+    def reset(self):
+        self.pending = []
+        self.pool.submit(self.device_id, None).result(self.pool.timeout)
+
+class InferenceWorkerPool:
+    # Runs per-device GesturePredictors (numpy backend) in num_workers
+    # processes. Every device is pinned to one worker by device_worker(), and
+    # requests and results travel over multiprocessing queues; a listener
+    # thread resolves the futures returned by submit().
+    def __init__(self, num_workers=None, model_dir=None, dataset_dir=None,
+                 predictor_options=None, idle_timeout=300.0, timeout=10.0):
+        from model_registry import resolve_model_dirs
+
+        self.num_workers = num_workers or os.cpu_count()
+        if model_dir is None:
+            model_dir, dataset_dir, self.version = resolve_model_dirs(MODEL_DIR, DATASET_DIR)
+        else:
+            self.version = None
+        self.model_dir = model_dir
+        self.dataset_dir = dataset_dir or DATASET_DIR
+        self.predictor_options = predictor_options or {}
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self.gesture_names = self.load_gesture_names(self.dataset_dir)
+
+        self._context = multiprocessing.get_context('spawn')
+        self._requests = []
+        self._results = None
+        self._processes = []
+        self._futures = {}
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self._listener = None
+        self.requests_per_worker = [0] * self.num_workers
+        self.healthy = True
+        self.error = None
+
+    @staticmethod
+    def load_gesture_names(dataset_dir):
+        with open(os.path.join(dataset_dir, 'label_encoder.json'), 'r') as f:
+            classes = json.load(f)['classes']
+        gesture_names = {-1: 'collecting_data', 0: 'scanning'}
+        for i, name in enumerate(classes):
+            gesture_names[i + 1] = name
+        return gesture_names
+
+    def start(self, timeout=60.0):
+        from numpy_backend import unpack_weights
+
+        # Unpacked once here, before any worker maps the files.
+        unpack_weights(os.path.join(self.model_dir, 'gesture_model.npz'),
+                       os.path.join(self.model_dir, 'gesture_model_weights'))
+
+        self._results = self._context.Queue()
+        for worker_id in range(self.num_workers):
+            requests = self._context.Queue()
+            process = self._context.Process(
+                target=run_worker,
+                args=(worker_id, self.model_dir, self.dataset_dir, self.predictor_options,
+                      requests, self._results, self.idle_timeout),
+                name=f'inference-worker-{worker_id}',
+                daemon=True
+            )
+            process.start()
+            self._requests.append(requests)
+            self._processes.append(process)
+
+        for _ in range(self.num_workers):
+            self._results.get(timeout=timeout)
+
+        self._listener = threading.Thread(target=self._listen, name='inference-results', daemon=True)
+        self._listener.start()
+        return self
+
+    def stop(self, timeout=5.0):
+        for requests in self._requests:
+            requests.put(None)
+        for process in self._processes:
+            process.join(timeout)
+        if self._results is not None:
+            self._results.put(None)
+        if self._listener is not None:
+            self._listener.join(timeout)
+        self._requests, self._processes, self._listener = [], [], None
+
+    def _listen(self):
+        while True:
+            message = self._results.get()
+            if message is None:
+                break
+
+            request_id, result, error = message
+            with self._lock:
+                future = self._futures.pop(request_id, None)
+            if future is None:
+                continue
+            if error is not None:
+                future.set_exception(RuntimeError(error))
+            else:
+                future.set_result(result)
+
+    def submit(self, device_id, samples):
+        worker_id = device_worker(device_id, self.num_workers)
+        future = Future()
+        with self._lock:
+            if not self._processes:
+                raise RuntimeError("InferenceWorkerPool is not running")
+            request_id = self._next_id
+            self._next_id += 1
+            self._futures[request_id] = future
+            self.requests_per_worker[worker_id] += 1
+        self._requests[worker_id].put((request_id, device_id, samples))
+        return future
+
+    def reload(self, model_dir, dataset_dir, version=None, timeout=60.0):
+        # Every worker loads the new version and moves its devices' buffered
+        # samples over to it between two of their requests. If any worker
+        # fails, all of them are sent back to the current version, so the pool
+        # never serves two versions at once; if even that fails, the pool is
+        # marked unhealthy.
+        from numpy_backend import unpack_weights
+
+        unpack_weights(os.path.join(model_dir, 'gesture_model.npz'),
+                       os.path.join(model_dir, 'gesture_model_weights'))
+
+        error = self._switch_workers((model_dir, dataset_dir, version), timeout)
+        if error is not None:
+            rollback_error = self._switch_workers((self.model_dir, self.dataset_dir, self.version), timeout)
+            if rollback_error is not None:
+                self.healthy = False
+                self.error = f"Reload to {version or model_dir} failed ({error}), rollback failed ({rollback_error})"
+                raise RuntimeError(self.error)
+            raise RuntimeError(f"Reload to {version or model_dir} failed, workers kept version {self.version}: {error}")
+
+        self.model_dir, self.dataset_dir, self.version = model_dir, dataset_dir, version
+        self.gesture_names = self.load_gesture_names(dataset_dir)
+        self.healthy, self.error = True, None
+
+    def _switch_workers(self, model, timeout):
+        # Sends (model_dir, dataset_dir, version) to every worker and returns
+        # the first error, or None once all of them have switched. A worker
+        # that timed out still switches later, as messages are handled in order.
+        futures = []
+        with self._lock:
+            for requests in self._requests:
+                future = Future()
+                self._futures[self._next_id] = future
+                requests.put((self._next_id, None, model))
+                self._next_id += 1
+                futures.append(future)
+
+        error = None
+        for future in futures:
+            try:
+                future.result(timeout)
+            except Exception as e:
+                error = error or f"{type(e).__name__}: {e}"
+        return error
+
+    def predictor(self, device_id):
+        return RemotePredictor(self, device_id)
+
+    def stats(self):
+        return {
+            'workers': self.num_workers,
+            'version': self.version,
+            'healthy': self.healthy,
+            'error': self.error,
+            'alive': sum(process.is_alive() for process in self._processes),
+            'pending': len(self._futures),
+            'requests_per_worker': list(self.requests_per_worker)
+        }
@@ -0,0 +1,346 @@
+import os
+import re
+import csv
+import glob
+import json
+import shutil
+import hashlib
+import warnings
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+# Columnar store for collected recordings. Every repetition is appended to
+# two flat binary files, and a small CSV index records where it starts:
+#   samples.f32  float32 (total_steps, 9): flex little, ring, middle, index,
+#                thumb, quat w, x, y, z
+#   times.i64    int64 (total_steps,): device timestamps in milliseconds
+#   index.csv    ID_person, gesture, repetition, offset, length
+# The binary files are memory-mapped on load, so each sequence is a view into
+# the mapping rather than a parsed copy.
+NUM_FEATURES = 9
+SAMPLES_FILE = 'samples.f32'
+TIMES_FILE = 'times.i64'
+INDEX_FILE = 'index.csv'
+INDEX_COLUMNS = ['ID_person', 'gesture', 'repetition', 'offset', 'length']
+CSV_COLUMNS = [
+    'flexLittle', 'flexRing', 'flexMiddle', 'flexIndex', 'flexThumb',
+    'quatW', 'quatX', 'quatY', 'quatZ'
+]
+# Parsed CSV files are cached as stores in this directory next to the CSV,
+# one per file named <csv name>-<key>, where the key covers the file's path,
+# size and modification time.
+CACHE_DIR = '.recordings_cache'
+
+class RecordingWriter:
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+        index_path = os.path.join(path, INDEX_FILE)
+        new_index = not os.path.exists(index_path)
+        self.offset = 0 if new_index else self.recover(path)
+
+        self.samples_file = open(os.path.join(path, SAMPLES_FILE), 'ab')
+        self.times_file = open(os.path.join(path, TIMES_FILE), 'ab')
+        self.index_file = open(index_path, 'a', newline='', encoding='utf-8')
+        self.index_writer = csv.writer(self.index_file)
+        if new_index:
+            self.index_writer.writerow(INDEX_COLUMNS)
+            self.index_file.flush()
+
+    @staticmethod
+    def recover(path):
+        # The index is the source of truth: a half-written last index row is
+        # dropped, and samples and timestamps past the last indexed step,
+        # left by an append that was interrupted, are truncated away so the
+        # next recording starts where the index says it does. Returns that
+        # offset in steps.
+        index_path = os.path.join(path, INDEX_FILE)
+        with open(index_path, 'rb') as f:
+            content = f.read()
+        if content and not content.endswith(b'\n'):
+            with open(index_path, 'r+b') as f:
+                f.truncate(content.rfind(b'\n') + 1)
+
+        index = Recordings.read_index(index_path)
+        offset = int((index['offsets'] + index['lengths']).max()) if len(index['offsets']) else 0
+
+        for name, step_size in ((SAMPLES_FILE, NUM_FEATURES * 4), (TIMES_FILE, 8)):
+            file_path = os.path.join(path, name)
+            size = os.path.getsize(file_path) if os.path.exists(file_path) else 0
+            if size < offset * step_size:
+                raise ValueError(f"{file_path} holds {size // step_size} steps, "
+                                 f"but {index_path} indexes {offset}")
+            if size > offset * step_size:
+                with open(file_path, 'r+b') as f:
+                    f.truncate(offset * step_size)
+        return offset
+
+    def append(self, person_id, gesture, repetition, times, samples):
+        samples = np.ascontiguousarray(samples, dtype='<f4').reshape(-1, NUM_FEATURES)
+        times = np.ascontiguousarray(times, dtype='<i8')
+        if len(times) != len(samples):
+            raise ValueError(f"Got {len(times)} timestamps for {len(samples)} samples")
+
+        # Data goes down before its index row; if the write is interrupted,
+        # the next RecordingWriter truncates the unindexed data (recover()).
+        self.samples_file.write(samples.tobytes())
+        self.times_file.write(times.tobytes())
+        self.samples_file.flush()
+        self.times_file.flush()
+
+        self.index_writer.writerow([person_id, gesture, repetition, self.offset, len(samples)])
+        self.index_file.flush()
+        self.offset += len(samples)
+
+    def extend(self, person_ids, gestures, repetitions, lengths, times, samples):
+        # Many recordings at once, laid out back to back as in the store.
+        samples = np.ascontiguousarray(samples, dtype='<f4').reshape(-1, NUM_FEATURES)
+        times = np.ascontiguousarray(times, dtype='<i8')
+        lengths = np.asarray(lengths, dtype=np.int64)
+        if len(times) != len(samples) or int(lengths.sum()) != len(samples):
+            raise ValueError(f"Got {len(times)} timestamps and {int(lengths.sum())} indexed steps "
+                             f"for {len(samples)} samples")
+
+        self.samples_file.write(samples.tobytes())
+        self.times_file.write(times.tobytes())
+        self.samples_file.flush()
+        self.times_file.flush()
+
+        offsets = self.offset + np.concatenate([[0], np.cumsum(lengths)[:-1]]).astype(np.int64)
+        self.index_writer.writerows(zip(person_ids, gestures, repetitions, offsets.tolist(), lengths.tolist()))
+        self.index_file.flush()
+        self.offset += len(samples)
+
+    def close(self):
+        self.samples_file.close()
+        self.times_file.close()
+        self.index_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class Recordings:
+    def __init__(self, path):
+        self.path = path
+
+        index = self.read_index(os.path.join(path, INDEX_FILE))
+        self.person_ids = index['person_ids']
+        self.gestures = index['gestures']
+        self.repetitions = index['repetitions']
+        self.offsets = index['offsets']
+        self.lengths = index['lengths']
+
+        total = int((self.offsets + self.lengths).max()) if len(self.offsets) else 0
+        self.samples = map_array(os.path.join(path, SAMPLES_FILE), np.dtype('<f4'), (total, NUM_FEATURES))
+        self.times = map_array(os.path.join(path, TIMES_FILE), np.dtype('<i8'), (total,))
+
+    @staticmethod
+    def read_index(index_path):
+        with open(index_path, newline='', encoding='utf-8') as f:
+            rows = list(csv.DictReader(f))
+
+        return {
+            'person_ids': [row['ID_person'] for row in rows],
+            'gestures': [row['gesture'] for row in rows],
+            'repetitions': np.array([int(row['repetition']) for row in rows], dtype=np.int64),
+            'offsets': np.array([int(row['offset']) for row in rows], dtype=np.int64),
+            'lengths': np.array([int(row['length']) for row in rows], dtype=np.int64)
+        }
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def sequence(self, i):
+        start = self.offsets[i]
+        return self.samples[start:start + self.lengths[i]]
+
+    def sequences(self):
+        return [self.sequence(i) for i in range(len(self))]
+
+    def timestamps(self, i):
+        start = self.offsets[i]
+        return self.times[start:start + self.lengths[i]]
+
+def map_array(path, dtype, shape):
+    if shape[0] == 0:
+        return np.zeros(shape, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r', shape=shape)
+
+def load_recordings(path):
+    return Recordings(path)
+
+def csv_row_arrays(row):
+    times = np.array(json.loads(row['time']), dtype=np.int64)
+    samples = np.empty((len(times), NUM_FEATURES), dtype=np.float32)
+    for i, column in enumerate(CSV_COLUMNS):
+        samples[:, i] = json.loads(row[column])
+    return times, samples
+
+def list_lengths(values):
+    return np.array([value.count(',') + 1 if value.strip('[] ') else 0 for value in values], dtype=np.int64)
+
+def parse_list_column(values, dtype):
+    # The whole column in one np.fromstring call instead of json.loads per row.
+    text = ','.join(filter(None, (value.strip().strip('[]').strip() for value in values)))
+    if not text:
+        return np.zeros(0, dtype=dtype)
+    # Text that does not parse stops np.fromstring early with a warning (an
+    # error in later numpy versions); parse_csv notices the short result.
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', DeprecationWarning)
+        try:
+            return np.fromstring(text, dtype=dtype, sep=',')
+        except ValueError:
+            return None
+
+def parse_csv(csv_path):
+    # (person_ids, gestures, repetitions, lengths, times, samples) of a
+    # collected CSV file, with the samples of all rows concatenated.
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        rows = list(reader)
+    columns = dict(zip(header, zip(*rows))) if rows else {name: () for name in header}
+
+    lengths = list_lengths(columns['time'])
+    total = int(lengths.sum())
+    arrays = [parse_list_column(columns['time'], np.int64)]
+    arrays += [parse_list_column(columns[name], np.float32) for name in CSV_COLUMNS]
+
+    consistent = all(array is not None and len(array) == total for array in arrays) and all(
+        np.array_equal(list_lengths(columns[name]), lengths) for name in CSV_COLUMNS
+    )
+    if consistent:
+        times, samples = arrays[0], np.stack(arrays[1:], axis=1)
+    else:
+        # Rows the fast path cannot split safely (ragged columns, non-integer
+        # timestamps) go through json so errors point at the offending row.
+        parsed = [csv_row_arrays(dict(zip(header, row))) for row in rows]
+        lengths = np.array([len(row_times) for row_times, _ in parsed], dtype=np.int64)
+        times = np.concatenate([row_times for row_times, _ in parsed]) if parsed else np.zeros(0, dtype=np.int64)
+        samples = (np.concatenate([row_samples for _, row_samples in parsed]) if parsed
+                   else np.zeros((0, NUM_FEATURES), dtype=np.float32))
+
+    return (list(columns['ID_person']), list(columns['gesture']), list(columns['repetition']),
+            lengths, times, samples)
+
+def convert_csv(csv_path, store_path):
+    person_ids, gestures, repetitions, lengths, times, samples = parse_csv(csv_path)
+    with RecordingWriter(store_path) as writer:
+        writer.extend(person_ids, gestures, repetitions, lengths, times, samples)
+
+    print(f"Converted {len(lengths)} recordings from {csv_path} to {store_path}")
+    return len(lengths)
+
+def csv_cache_path(csv_path, cache_dir=None):
+    csv_path = os.path.abspath(csv_path)
+    stat = os.stat(csv_path)
+    key = hashlib.blake2b(f'{csv_path}:{stat.st_size}:{stat.st_mtime_ns}'.encode('utf-8'), digest_size=8).hexdigest()
+    cache_dir = cache_dir or os.path.join(os.path.dirname(csv_path), CACHE_DIR)
+    return os.path.join(cache_dir, f'{os.path.splitext(os.path.basename(csv_path))[0]}-{key}')
+
+def cache_csv(csv_path, cache_dir=None):
+    # Parses csv_path into a store under the cache directory unless an up to
+    # date one is there already, and returns the store's path.
+    store_path = csv_cache_path(csv_path, cache_dir)
+    if os.path.isdir(store_path):
+        return store_path
+
+    # Written under a temporary name and renamed, so a store in the cache is
+    # always complete even if parsing is interrupted or runs concurrently.
+    tmp_path = f'{store_path}.tmp-{os.getpid()}'
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    with RecordingWriter(tmp_path) as writer:
+        writer.extend(*parse_csv(csv_path))
+    try:
+        os.rename(tmp_path, store_path)
+    except OSError:
+        if not os.path.isdir(store_path):
+            raise
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+    # Caches of earlier versions of the same file.
+    cache_dir, name = os.path.split(store_path)
+    stale = re.compile(re.escape(name.rsplit('-', 1)[0]) + r'-[0-9a-f]{16}')
+    for other in os.listdir(cache_dir):
+        if other != name and stale.fullmatch(other):
+            shutil.rmtree(os.path.join(cache_dir, other), ignore_errors=True)
+    return store_path
+
+def load_csv_files(csv_paths, cache_dir=None, workers=None):
+    # Recordings of each CSV file. Files without an up to date cache are
+    # parsed in parallel, one per process.
+    uncached = [path for path in csv_paths if not os.path.isdir(csv_cache_path(path, cache_dir))]
+    workers = min(workers or os.cpu_count() or 1, len(uncached))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+            list(pool.map(cache_csv, uncached, [cache_dir] * len(uncached)))
+    else:
+        for path in uncached:
+            cache_csv(path, cache_dir)
+
+    return [load_recordings(cache_csv(path, cache_dir)) for path in csv_paths]
+
+def count_csv_recordings(csv_path):
+    # One line per recording: the list columns never contain newlines.
+    with open(csv_path, 'rb') as f:
+        return max(sum(1 for line in f if line.strip()) - 1, 0)
+
+def default_dataset_path(dataset_dir):
+    # dataset/recordings if present, else dataset/collected_data.csv.
+    # collect.py writes every repetition to both, so the CSV holds at least
+    # what the store does. A store started after the CSV already had data
+    # lacks those recordings, and the CSV is used instead until it is rebuilt.
+    store_path = os.path.join(dataset_dir, 'recordings')
+    csv_path = os.path.join(dataset_dir, 'collected_data.csv')
+    if not os.path.exists(os.path.join(store_path, INDEX_FILE)):
+        return csv_path
+    if os.path.exists(csv_path):
+        missing = count_csv_recordings(csv_path) - len(load_recordings(store_path))
+        if missing > 0:
+            print(f"WARNING: {store_path} lacks {missing} recordings of {csv_path}, using the CSV. "
+                  f"To rebuild the store, remove it and run: python recordings.py convert {csv_path} {store_path}")
+            return csv_path
+    return store_path
+
+def load_dataset_recordings(path, cache_dir=None, workers=None):
+    # A recording store, a collected CSV file or a directory of CSV files from
+    # several collection sessions, as a list of Recordings.
+    if os.path.exists(os.path.join(path, INDEX_FILE)):
+        return [load_recordings(path)]
+    if os.path.isdir(path):
+        csv_paths = sorted(glob.glob(os.path.join(path, '*.csv')))
+        if not csv_paths:
+            raise FileNotFoundError(f"No recording store or CSV files in {path}")
+    else:
+        csv_paths = [path]
+    return load_csv_files(csv_paths, cache_dir, workers)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Manage the columnar gesture recording store')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    convert = subparsers.add_parser('convert', help='append recordings from a collected CSV file to a store')
+    convert.add_argument('csv_path')
+    convert.add_argument('store_path')
+
+    info = subparsers.add_parser('info', help='summarise the recordings in a store')
+    info.add_argument('store_path')
+    return parser.parse_args()
+
+if __name__ == '__main__':
+    args = parse_args()
+
+    if args.command == 'convert':
+        convert_csv(args.csv_path, args.store_path)
+    else:
+        recordings = load_recordings(args.store_path)
+        print(f"{len(recordings)} recordings, {len(recordings.samples)} samples")
+        for gesture in sorted(set(recordings.gestures)):
+            print(f"  {gesture}: {recordings.gestures.count(gesture)}")
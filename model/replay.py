@@ -0,0 +1,168 @@
+import os
+import sys
+import json
+import time
+import argparse
+import multiprocessing
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+from recordings import load_dataset_recordings, default_dataset_path
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'predict_module'))
+from predictor import GesturePredictor, get_model
+from simple_predictor import SimpleGestureDetector
+
+PREDICTORS = ['simple', 'keras', 'numpy', 'streaming']
+
+# Detector used by each worker process, created once by the pool initializer.
+_detector = None
+
+def load_replay_recordings(dataset_path, limit=None):
+    recordings = []
+    for store in load_dataset_recordings(dataset_path):
+        for i in range(len(store)):
+            if limit is not None and len(recordings) >= limit:
+                return recordings
+            recordings.append({
+                'person': store.person_ids[i],
+                'gesture': store.gestures[i],
+                'repetition': int(store.repetitions[i]),
+                'times': np.asarray(store.timestamps(i)),
+                'samples': np.asarray(store.sequence(i))
+            })
+    return recordings
+
+def create_detector(predictor):
+    if predictor == 'simple':
+        return SimpleGestureDetector()
+    if predictor == 'streaming':
+        return GesturePredictor(model=get_model('numpy'), streaming=True)
+    return GesturePredictor(model=get_model(predictor))
+
+def init_worker(predictor):
+    global _detector
+    _detector = create_detector(predictor)
+
+def replay_recording(detector, recording):
+    detector.reset()
+    names = detector.gesture_names
+    samples = recording['samples']
+    times = recording['times']
+
+    predictions = np.empty(len(samples), dtype=np.int64)
+    start = time.perf_counter()
+    for i, sample in enumerate(samples):
+        predictions[i] = detector.predict(sample)
+    elapsed = time.perf_counter() - start
+
+    changes = np.flatnonzero(np.diff(predictions, prepend=predictions[:1] - 1))
+    timeline = [[int(i), names.get(int(predictions[i]), 'unknown')] for i in changes]
+
+    # The recording's decision is the gesture predicted most often once the
+    # detector is past collecting data and scanning.
+    detected = Counter(int(p) for p in predictions if p > 0)
+    decision = names[detected.most_common(1)[0][0]] if detected else names[0]
+
+    label_ids = [gesture_id for gesture_id, name in names.items() if name == recording['gesture']]
+    hits = np.flatnonzero(np.isin(predictions, label_ids))
+    detected_at = int(hits[0]) if len(hits) else None
+
+    return {
+        'person': recording['person'],
+        'gesture': recording['gesture'],
+        'repetition': recording['repetition'],
+        'samples': len(samples),
+        'decision': decision,
+        'correct': decision == recording['gesture'],
+        'detection_latency_samples': detected_at,
+        'detection_latency_ms': int(times[detected_at] - times[0]) if detected_at is not None else None,
+        'seconds': elapsed,
+        'samples_per_s': len(samples) / elapsed if elapsed > 0 else 0.0,
+        'timeline': timeline
+    }
+
+def replay_chunk(recordings):
+    return [replay_recording(_detector, recording) for recording in recordings]
+
+def replay(recordings, predictor, workers=1):
+    if workers <= 1:
+        init_worker(predictor)
+        return replay_chunk(recordings)
+
+    chunk_size = max(1, int(np.ceil(len(recordings) / (workers * 4))))
+    chunks = [recordings[i:i + chunk_size] for i in range(0, len(recordings), chunk_size)]
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=init_worker,
+        initargs=(predictor,)
+    ) as pool:
+        return [result for chunk in pool.map(replay_chunk, chunks) for result in chunk]
+
+def summarize(results, elapsed):
+    latencies = [r['detection_latency_samples'] for r in results if r['detection_latency_samples'] is not None]
+    total_samples = sum(r['samples'] for r in results)
+
+    per_gesture = {}
+    for gesture in sorted({r['gesture'] for r in results}):
+        gesture_results = [r for r in results if r['gesture'] == gesture]
+        per_gesture[gesture] = float(np.mean([r['correct'] for r in gesture_results]))
+
+    return {
+        'recordings': len(results),
+        'accuracy': float(np.mean([r['correct'] for r in results])) if results else 0.0,
+        'per_gesture_accuracy': per_gesture,
+        'detected': len(latencies),
+        'median_detection_latency_samples': float(np.median(latencies)) if latencies else None,
+        'mean_detection_latency_samples': float(np.mean(latencies)) if latencies else None,
+        'samples': total_samples,
+        'elapsed_s': elapsed,
+        'samples_per_s': total_samples / elapsed if elapsed > 0 else 0.0
+    }
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Replay recorded gestures through a predictor without the glove')
+    parser.add_argument('--dataset', help='recording store directory or collected CSV file '
+                                          '(default: dataset/recordings if present, else dataset/collected_data.csv)')
+    parser.add_argument('--predictor', choices=PREDICTORS, default='simple')
+    parser.add_argument('--workers', type=int, default=1, help='replay recordings in this many processes')
+    parser.add_argument('--limit', type=int, help='only replay the first N recordings')
+    parser.add_argument('--timeline', action='store_true', help='print each recording\'s prediction timeline')
+    parser.add_argument('--min-accuracy', type=float, help='exit non-zero if accuracy falls below this')
+    parser.add_argument('--output', help='write per-recording results and the summary as JSON')
+    return parser.parse_args()
+
+if __name__ == '__main__':
+    args = parse_args()
+
+    dataset_dir = os.path.join(os.path.dirname(__file__), 'dataset')
+    dataset_path = args.dataset or default_dataset_path(dataset_dir)
+
+    recordings = load_replay_recordings(dataset_path, args.limit)
+    print(f"Replaying {len(recordings)} recordings from {dataset_path} through '{args.predictor}' "
+          f"with {args.workers} worker(s)")
+
+    start = time.perf_counter()
+    results = replay(recordings, args.predictor, args.workers)
+    summary = summarize(results, time.perf_counter() - start)
+
+    for r in results:
+        latency = (f"detected after {r['detection_latency_samples']} samples ({r['detection_latency_ms']} ms)"
+                   if r['detection_latency_samples'] is not None else "never detected")
+        print(f"{'OK  ' if r['correct'] else 'MISS'} person {r['person']} {r['gesture']} #{r['repetition']}: "
+              f"decided {r['decision']}, {latency}, {r['samples_per_s']:.0f} samples/s")
+        if args.timeline:
+            print('     ' + ' -> '.join(f"{name}@{index}" for index, name in r['timeline']))
+
+    print(json.dumps(summary, indent=2))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'predictor': args.predictor, 'dataset': dataset_path, 'summary': summary, 'results': results},
+                      f, indent=2)
+
+    if args.min_accuracy is not None and summary['accuracy'] < args.min_accuracy:
+        print(f"FAIL: accuracy {summary['accuracy']:.4f} is below {args.min_accuracy}")
+        sys.exit(1)
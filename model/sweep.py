@@ -0,0 +1,256 @@
+import os
+import sys
+import json
+import time
+import argparse
+import itertools
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+from types import SimpleNamespace
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras.callbacks import EarlyStopping
+from sklearn.model_selection import GroupKFold
+from sklearn.preprocessing import LabelEncoder
+
+import train
+from recordings import load_dataset_recordings
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'predict_module'))
+from numpy_backend import NumpyModel
+
+SEARCH_SPACE = {
+    'filters': [4, 8, 16],
+    'kernel_size': [5, 7, 9],
+    'dropout': [0.4, 0.6],
+    'learning_rate': [0.0002, 0.001]
+}
+
+# Arrays attached from shared memory in each worker process.
+_dataset = {}
+_blocks = []
+
+def load_groups(dataset_path):
+    return np.array([person_id for recordings in load_dataset_recordings(dataset_path)
+                     for person_id in recordings.person_ids])
+
+def share_arrays(arrays):
+    blocks = []
+    spec = {}
+    for name, array in arrays.items():
+        block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+        blocks.append(block)
+        spec[name] = (block.name, array.shape, array.dtype.str)
+    return blocks, spec
+
+def attach_dataset(spec):
+    # Trials already run one per core, so each one keeps TensorFlow to a
+    # single thread instead of oversubscribing the machine.
+    tf.config.threading.set_intra_op_parallelism_threads(1)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+
+    for name, (block_name, shape, dtype) in spec.items():
+        block = shared_memory.SharedMemory(name=block_name)
+        _blocks.append(block)
+        _dataset[name] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+
+def build_trials(space, num_random=None, seed=42):
+    keys = list(space)
+    trials = [dict(zip(keys, values)) for values in itertools.product(*space.values())]
+    if num_random and num_random < len(trials):
+        rng = np.random.default_rng(seed)
+        trials = [trials[i] for i in sorted(rng.choice(len(trials), num_random, replace=False))]
+    return trials
+
+def measure_latency(path, input_shape, repeats=200):
+    numpy_model = NumpyModel(path)
+
+    window = np.zeros((1,) + input_shape, dtype=np.float32)
+    numpy_model.predict_batch(window)
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        numpy_model.predict_batch(window)
+        times.append(time.perf_counter() - start)
+
+    return float(np.median(times) * 1000.0)
+
+def run_fold(trial, fold, train_idx, test_idx, epochs, batch_size, seed, export_path=None):
+    X = _dataset['X']
+    lengths = _dataset['lengths']
+    y = _dataset['y']
+    num_classes = int(y.max()) + 1
+    input_shape = X.shape[1:]
+
+    tf.keras.utils.set_random_seed(seed + fold)
+
+    X_train = X[train_idx]
+    scaler = SimpleNamespace(
+        mean_=X_train.mean(axis=(0, 1), dtype=np.float64),
+        scale_=np.maximum(X_train.std(axis=(0, 1), dtype=np.float64), 1e-12)
+    )
+
+    model = train.create_model(input_shape, num_classes, **trial)
+    start = time.perf_counter()
+    history = model.fit(
+        train.AugmentedBatches(X_train, lengths[train_idx], y[train_idx], scaler,
+                               batch_size=batch_size, augmentation_factor=5, seed=seed + fold),
+        epochs=epochs,
+        verbose=0,
+        callbacks=[EarlyStopping(monitor='loss', patience=5, restore_best_weights=True)]
+    )
+    train_seconds = time.perf_counter() - start
+
+    X_test = ((X[test_idx] - scaler.mean_) / scaler.scale_).astype(np.float32)
+    y_pred = np.argmax(model.predict(X_test, batch_size=256, verbose=0), axis=1)
+
+    result = {
+        'fold': fold,
+        'accuracy': float(np.mean(y_pred == y[test_idx])),
+        'epochs': len(history.epoch),
+        'train_seconds': train_seconds
+    }
+    if export_path is not None:
+        # Latency is measured later by the parent, once no trial is training.
+        train.export_numpy_model(model, scaler, export_path)
+        result['size_bytes'] = os.path.getsize(export_path)
+        result['params'] = int(model.count_params())
+    return result
+
+def summarize(trial, fold_results, latency_ms):
+    accuracies = [result['accuracy'] for result in fold_results]
+    measured = next(result for result in fold_results if 'size_bytes' in result)
+    return {
+        **trial,
+        'accuracy': float(np.mean(accuracies)),
+        'accuracy_std': float(np.std(accuracies)),
+        'fold_accuracies': accuracies,
+        'latency_ms': latency_ms,
+        'size_bytes': measured['size_bytes'],
+        'params': measured['params'],
+        'train_seconds': float(sum(result['train_seconds'] for result in fold_results))
+    }
+
+def print_leaderboard(leaderboard):
+    print(f"{'rank':>4} {'filters':>7} {'kernel':>6} {'dropout':>7} {'lr':>8} "
+          f"{'accuracy':>12} {'latency ms':>10} {'size KB':>8} {'params':>7}")
+    for rank, entry in enumerate(leaderboard, 1):
+        print(f"{rank:>4} {entry['filters']:>7} {entry['kernel_size']:>6} {entry['dropout']:>7} "
+              f"{entry['learning_rate']:>8} {entry['accuracy']:>6.4f}±{entry['accuracy_std']:.3f} "
+              f"{entry['latency_ms']:>10.3f} {entry['size_bytes'] / 1024:>8.1f} {entry['params']:>7}")
+
+def run_sweep(args):
+    dataset_dir = os.path.join(os.path.dirname(__file__), 'dataset')
+    dataset_path = args.dataset or train.default_dataset_path(dataset_dir)
+
+    sequences, labels = train.load_dataset(dataset_path, augment=False)
+    groups = load_groups(dataset_path)
+    X, lengths = train.pad_sequences(sequences)
+    y = LabelEncoder().fit_transform(labels)
+
+    num_groups = len(np.unique(groups))
+    if num_groups < 2:
+        raise ValueError(f"Grouped cross-validation needs recordings from at least 2 people, found {num_groups}")
+    folds = list(GroupKFold(n_splits=min(args.folds, num_groups)).split(X, y, groups))
+
+    space = {
+        'filters': args.filters,
+        'kernel_size': args.kernel_size,
+        'dropout': args.dropout,
+        'learning_rate': args.learning_rate
+    }
+    trials = build_trials(space, args.random, args.seed)
+    print(f"{len(trials)} trials x {len(folds)} folds on {len(X)} recordings from {num_groups} people, "
+          f"{args.workers} workers")
+
+    input_shape = X.shape[1:]
+    blocks, spec = share_arrays({'X': X, 'lengths': lengths, 'y': y})
+    del X, sequences
+
+    # Fold 0 of every trial exports its weights here; their latency is timed
+    # one after another once the pool is done, not next to trials training
+    # on every core.
+    export_dir = tempfile.TemporaryDirectory()
+    export_paths = [os.path.join(export_dir.name, f'trial-{i}.npz') for i in range(len(trials))]
+
+    results = {i: [] for i in range(len(trials))}
+    latencies = {}
+    try:
+        with ProcessPoolExecutor(
+            max_workers=args.workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=attach_dataset,
+            initargs=(spec,)
+        ) as pool:
+            futures = {
+                pool.submit(run_fold, trial, fold, train_idx, test_idx,
+                            args.epochs, args.batch_size, args.seed, export_paths[i] if fold == 0 else None): i
+                for i, trial in enumerate(trials)
+                for fold, (train_idx, test_idx) in enumerate(folds)
+            }
+            for done, future in enumerate(as_completed(futures), 1):
+                i = futures[future]
+                result = future.result()
+                results[i].append(result)
+                print(f"[{done}/{len(futures)}] trial {i} {trials[i]} fold {result['fold']}: "
+                      f"accuracy {result['accuracy']:.4f}")
+
+        print(f"Measuring latency of {len(trials)} configurations")
+        for i, path in enumerate(export_paths):
+            latencies[i] = measure_latency(path, input_shape)
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+        export_dir.cleanup()
+
+    leaderboard = sorted(
+        (summarize(trial, results[i], latencies[i]) for i, trial in enumerate(trials)),
+        key=lambda entry: (-entry['accuracy'], entry['latency_ms'])
+    )
+    print_leaderboard(leaderboard)
+
+    report = {
+        'dataset': dataset_path,
+        'folds': len(folds),
+        'epochs': args.epochs,
+        'leaderboard': leaderboard
+    }
+    if args.target_accuracy is not None:
+        eligible = [entry for entry in leaderboard if entry['accuracy'] >= args.target_accuracy]
+        report['cheapest'] = min(eligible, key=lambda entry: (entry['latency_ms'], entry['size_bytes'])) if eligible else None
+        if report['cheapest'] is None:
+            print(f"No configuration reached accuracy {args.target_accuracy}")
+        else:
+            print(f"Cheapest configuration with accuracy >= {args.target_accuracy}: {report['cheapest']}")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Leaderboard saved to {args.output}")
+
+    return report
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Cross-validated hyperparameter sweep for the gesture model')
+    parser.add_argument('--dataset', help='recording store directory or collected CSV file')
+    parser.add_argument('--filters', type=int, nargs='+', default=SEARCH_SPACE['filters'])
+    parser.add_argument('--kernel-size', type=int, nargs='+', default=SEARCH_SPACE['kernel_size'])
+    parser.add_argument('--dropout', type=float, nargs='+', default=SEARCH_SPACE['dropout'])
+    parser.add_argument('--learning-rate', type=float, nargs='+', default=SEARCH_SPACE['learning_rate'])
+    parser.add_argument('--random', type=int, help='sample this many configurations from the grid instead of all')
+    parser.add_argument('--folds', type=int, default=5, help='folds grouped by ID_person')
+    parser.add_argument('--epochs', type=int, default=30)
+    parser.add_argument('--batch-size', type=int, default=16)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--target-accuracy', type=float,
+                        help='report the lowest-latency configuration reaching this mean accuracy')
+    parser.add_argument('--output', default=os.path.join(os.path.dirname(__file__), 'saved_model', 'sweep_leaderboard.json'))
+    return parser.parse_args()
+
+if __name__ == '__main__':
+    run_sweep(parse_args())
@@ -0,0 +1,33 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from recordings import RecordingWriter, load_recordings, SAMPLES_FILE, TIMES_FILE, INDEX_FILE
+
+def recording(length, start):
+    return np.arange(start, start + length, dtype=np.int64), np.full((length, 9), start, dtype=np.float32)
+
+def test_writer_recovers_from_an_interrupted_append(tmp_path):
+    with RecordingWriter(str(tmp_path)) as writer:
+        writer.append('p1', 'hello', 1, *recording(5, 0))
+
+    # An append cut short: part of a sample, part of a timestamp, half an index row.
+    with open(tmp_path / SAMPLES_FILE, 'ab') as f:
+        f.write(b'\0' * 20)
+    with open(tmp_path / TIMES_FILE, 'ab') as f:
+        f.write(b'\0' * 11)
+    with open(tmp_path / INDEX_FILE, 'a') as f:
+        f.write('p1,thanks,2,5')
+
+    with RecordingWriter(str(tmp_path)) as writer:
+        writer.append('p1', 'yes', 3, *recording(4, 100))
+
+    recordings = load_recordings(str(tmp_path))
+    assert recordings.gestures == ['hello', 'yes']
+    assert list(recordings.lengths) == [5, 4]
+    np.testing.assert_array_equal(recordings.sequence(1), recording(4, 100)[1])
+    np.testing.assert_array_equal(recordings.timestamps(1), recording(4, 100)[0])
+    assert os.path.getsize(tmp_path / SAMPLES_FILE) == 9 * 9 * 4
+    assert os.path.getsize(tmp_path / TIMES_FILE) == 9 * 8
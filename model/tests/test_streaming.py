@@ -0,0 +1,22 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'predict_module'))
+from predictor import GestureModel, GesturePredictor
+
+def test_streaming_matches_full_recompute():
+    model = GestureModel(backend='numpy')
+    samples = np.random.default_rng(0).normal(1200, 150, size=(2 * model.max_length, model.num_features))
+
+    full = GesturePredictor(model=model)
+    streaming = GesturePredictor(model=model, streaming=True)
+    for sample in samples.astype(np.float32):
+        full.add_sample(sample)
+        streaming.add_sample(sample)
+
+        expected = model.predict_batch(full.prepare_window()[np.newaxis])[0]
+        actual = streaming.stream.predict()
+        np.testing.assert_allclose(actual, expected, rtol=0, atol=1e-5)
+        assert np.argmax(actual) == np.argmax(expected)
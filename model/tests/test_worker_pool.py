@@ -0,0 +1,28 @@
+import os
+import sys
+import shutil
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'predict_module'))
+from worker_pool import InferenceWorkerPool, MODEL_DIR, DATASET_DIR
+
+def test_failed_reload_keeps_every_worker_on_the_current_version(tmp_path):
+    # Weights that unpack fine, but no label encoder for the workers to load.
+    shutil.copy(os.path.join(MODEL_DIR, 'gesture_model.npz'), tmp_path)
+    shutil.copy(os.path.join(MODEL_DIR, 'model_params.json'), tmp_path)
+
+    pool = InferenceWorkerPool(2, MODEL_DIR, DATASET_DIR).start()
+    try:
+        with pytest.raises(RuntimeError, match='kept version'):
+            pool.reload(str(tmp_path), str(tmp_path), 'broken')
+
+        stats = pool.stats()
+        assert stats['healthy'] and stats['version'] is None
+        assert pool.model_dir == MODEL_DIR
+        sample = np.zeros(9, dtype=np.float32)
+        for device_id in ('glove-1', 'glove-2', 'glove-3'):
+            assert isinstance(pool.predictor(device_id).predict(sample), int)
+    finally:
+        pool.stop()
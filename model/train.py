@@ -1,10 +1,12 @@
 import os
+import sys
 import json
+import argparse
 import numpy as np
-import pandas as pd
 import tensorflow as tf
 from tensorflow.keras.models import Sequential
 from tensorflow.keras.layers import Conv1D, MaxPooling1D, Dense, Dropout, Flatten, BatchNormalization, Normalization, AveragePooling1D
+from tensorflow.keras.layers import GlobalAveragePooling1D
 from tensorflow.keras.callbacks import EarlyStopping, ModelCheckpoint, ReduceLROnPlateau
 from tensorflow.keras.regularizers import l2
 from sklearn.model_selection import train_test_split
@@ -13,98 +15,245 @@ from sklearn.metrics import confusion_matrix, classification_report
 from sklearn.utils.class_weight import compute_class_weight
 import matplotlib.pyplot as plt
 import seaborn as sns
-from joblib import dump
+from joblib import dump, load
 
-def augment_time_series(sequences, labels, augmentation_factor=2):
+sys.path.append(os.path.join(os.path.dirname(__file__), 'predict_module'))
+from numpy_backend import NumpyModel
+from tflite_backend import TFLiteModel, QUANTIZATIONS
+from model_registry import publish
+from predictor import load_keras_model
+from recordings import load_dataset_recordings, default_dataset_path
+
+# Variable-length models (--variable-length) are trained on this many random
+# windows per sequence and run on at most DEFAULT_WINDOW_LENGTH samples.
+DEFAULT_WINDOW_LENGTH = 48
+CROPS_PER_SEQUENCE = 4
+
+def pad_sequences(sequences, max_length=None, dtype=np.float32):
+    # Right-aligned like the predictor's window: padding goes in front.
+    lengths = np.array([len(seq) for seq in sequences], dtype=np.int64)
+    max_length = max_length or int(lengths.max())
+    
+    X = np.zeros((len(sequences), max_length, sequences[0].shape[1]), dtype=dtype)
+    for i, seq in enumerate(sequences):
+        X[i, max_length - len(seq):] = seq[-max_length:]
+    
+    return X, np.minimum(lengths, max_length)
+
+def crop_ends(lengths, max_length, window_length, crops_per_sequence, seed=None):
+    # crops_per_sequence random end points (exclusive) in each right-aligned
+    # sequence, at least window_length steps (or the whole sequence) in.
+    rng = np.random.default_rng(seed)
+    starts = (max_length - lengths)[:, np.newaxis]
+    return starts + rng.integers(np.minimum(lengths, window_length)[:, np.newaxis], lengths[:, np.newaxis] + 1,
+                                 size=(len(lengths), crops_per_sequence))
+
+def windows_ending_at(X, ends, window_length):
+    # The window_length steps before each end; steps before the start of X are
+    # zero, like the padding of pad_sequences.
+    X = np.pad(X, ((0, 0), (window_length, 0), (0, 0)))
+    steps = ends[:, :, np.newaxis] + np.arange(window_length)
+    crops = X[np.arange(len(X))[:, np.newaxis, np.newaxis], steps]
+    return crops.reshape(-1, window_length, X.shape[2])
+
+def random_crops(X, lengths, window_length, crops_per_sequence, seed=None):
+    # crops_per_sequence windows of window_length steps ending at random points
+    # of each right-aligned sequence, as the predictor sees them mid-gesture.
+    # Sequences shorter than the window keep their front padding.
+    ends = crop_ends(lengths, X.shape[1], window_length, crops_per_sequence, seed)
+    return windows_ending_at(X, ends, window_length), np.repeat(np.arange(len(X)), crops_per_sequence)
+
+def load_current_model(saved_model_dir, dataset_dir):
+    # The model being served before this run replaces it, for comparison.
+    from predictor import GestureModel
+    from model_registry import resolve_model_dirs
+    
+    model_dir, model_dataset_dir, version = resolve_model_dirs(saved_model_dir, dataset_dir)
+    try:
+        return GestureModel('numpy', model_dir, model_dataset_dir, version=version)
+    except (OSError, KeyError, ValueError) as e:
+        print(f"No current model to compare against ({e})")
+        return None
+
+def current_model_accuracy(model, X_raw, ends, labels, class_names):
+    # Accuracy of the current model on the windows of X_raw (unscaled,
+    # right-aligned) ending at ends, cut to the model's own window length.
+    X = model.transform(windows_ending_at(X_raw, ends, model.max_length)).astype(np.float32)
+    y_pred = np.concatenate([model.predict_batch(X[i:i + 256]) for i in range(0, len(X), 256)]).argmax(axis=1)
+    predicted = np.array(model.class_mapping)[y_pred]
+    return float(np.mean(predicted == np.asarray(class_names)[labels]))
+
+def augment_batch(X, lengths, rng, noise_level=0.15, num_scaled=5, scale_range=(0.8, 1.2),
+                  shift_fraction=0.2, max_mask_length=4):
+    num_sequences, max_length, num_features = X.shape
+    offsets = max_length - lengths
+    steps = np.arange(max_length)
+    position = steps[np.newaxis, :] - offsets[:, np.newaxis]
+    valid = (position >= 0)[:, :, np.newaxis]
+    
+    # Add significant noise to the recorded steps, leaving the padding at zero
+    augmented = rng.standard_normal(X.shape, dtype=np.float32)
+    augmented *= np.float32(noise_level)
+    augmented *= valid
+    augmented += X
+    
+    # Randomly scale amplitude in num_scaled distinct dimensions per sequence
+    scaled_dims = rng.random((num_sequences, num_features)).argsort(axis=1)[:, :num_scaled]
+    scale = np.ones((num_sequences, num_features), dtype=np.float32)
+    np.put_along_axis(scale, scaled_dims, rng.uniform(*scale_range, size=scaled_dims.shape), axis=1)
+    augmented *= scale[:, np.newaxis, :]
+    
+    # Time shift each sequence by shift_fraction of its length in a random
+    # direction, holding its first or last step at the edge
+    shifts = (lengths * shift_fraction).astype(np.int64) * rng.choice([-1, 1], size=num_sequences)
+    source = np.clip(position - shifts[:, np.newaxis], 0, (lengths - 1)[:, np.newaxis]) + offsets[:, np.newaxis]
+    source = np.where(valid[:, :, 0], source, steps) + (np.arange(num_sequences) * max_length)[:, np.newaxis]
+    augmented = augmented.reshape(-1, num_features)[source.ravel()].reshape(X.shape)
+    
+    # Random feature masking (set a short run of time steps to zero)
+    mask_lengths = rng.integers(1, max_mask_length + 1, size=num_sequences)
+    mask_starts = rng.integers(0, np.maximum(lengths - mask_lengths, 1))
+    masked = (
+        (position >= mask_starts[:, np.newaxis]) &
+        (position < (mask_starts + mask_lengths)[:, np.newaxis]) &
+        (lengths > max_mask_length + 1)[:, np.newaxis]
+    )
+    augmented[masked] = 0
+    
+    return augmented
+
+def augment_time_series(sequences, labels, augmentation_factor=2, seed=None):
+    rng = np.random.default_rng(seed)
+    X, lengths = pad_sequences(sequences)
+    
+    copies = np.repeat(np.arange(len(sequences)), augmentation_factor - 1)
+    augmented = augment_batch(X[copies], lengths[copies], rng)
+    
     augmented_sequences = []
     augmented_labels = []
     
-    for sequence, label in zip(sequences, labels):
+    copy = 0
+    for sequence, label, length in zip(sequences, labels, lengths):
         augmented_sequences.append(sequence)
         augmented_labels.append(label)
         
         for _ in range(augmentation_factor - 1):
-            # Time warping (random stretching/compressing of segments)
-            aug_seq = np.copy(sequence)
-            seq_len = len(sequence)
-            
-            # Add significant noise
-            noise_level = 0.15  # Increased noise
-            aug_seq += np.random.normal(0, noise_level, aug_seq.shape)
-            
-            # Randomly scale amplitude in some dimensions
-            scaling_dims = np.random.choice(aug_seq.shape[1], size=5, replace=False)  # More dimensions
-            for dim in scaling_dims:
-                scale_factor = np.random.uniform(0.8, 1.2)  # More aggressive scaling
-                aug_seq[:, dim] *= scale_factor
-            
-            # Time shift (move the sequence slightly)
-            shift = int(seq_len * 0.2)  # Larger shift
-            if shift > 0:
-                direction = np.random.choice([-1, 1])
-                if direction > 0:
-                    aug_seq = np.roll(aug_seq, shift, axis=0)
-                    aug_seq[:shift] = aug_seq[shift]
-                else:
-                    aug_seq = np.roll(aug_seq, -shift, axis=0)
-                    aug_seq[-shift:] = aug_seq[-shift-1]
-            
-            # Random feature masking (set random time steps to zero)
-            if seq_len > 5:
-                mask_length = np.random.randint(1, 5)
-                start_idx = np.random.randint(0, seq_len - mask_length)
-                aug_seq[start_idx:start_idx+mask_length, :] = 0
-            
-            augmented_sequences.append(aug_seq)
+            augmented_sequences.append(augmented[copy, X.shape[1] - length:])
             augmented_labels.append(label)
+            copy += 1
     
     return augmented_sequences, augmented_labels
 
-def load_dataset(csv_path, augment=True):
-    df = pd.read_csv(csv_path)
-    sequences = []
-    labels = []
-    
-    for _, row in df.iterrows():
-        flex_little = json.loads(row['flexLittle'])
-        flex_ring = json.loads(row['flexRing'])
-        flex_middle = json.loads(row['flexMiddle'])
-        flex_index = json.loads(row['flexIndex'])
-        flex_thumb = json.loads(row['flexThumb'])
-        quat_w = json.loads(row['quatW'])
-        quat_x = json.loads(row['quatX'])
-        quat_y = json.loads(row['quatY'])
-        quat_z = json.loads(row['quatZ'])
+class AugmentedBatches(tf.keras.utils.Sequence):
+    # Draws fresh augmentations of the raw padded training data for every
+    # batch instead of materialising augmentation_factor copies up front.
+    # About one sequence in augmentation_factor is passed through unchanged,
+    # matching the mix of the precomputed augmentation.
+    def __init__(self, X, lengths, y, scaler, batch_size=16, augmentation_factor=5, seed=None):
+        super().__init__()
+        self.X = X
+        self.lengths = lengths
+        self.y = y
+        self.mean = np.asarray(scaler.mean_, dtype=np.float32)
+        self.scale = np.asarray(scaler.scale_, dtype=np.float32)
+        self.batch_size = batch_size
+        self.keep_fraction = 1.0 / augmentation_factor
+        self.rng = np.random.default_rng(seed)
+        self.order = self.rng.permutation(len(X))
+        
+    def __len__(self):
+        return int(np.ceil(len(self.X) / self.batch_size))
+        
+    def __getitem__(self, index):
+        batch = self.order[index * self.batch_size:(index + 1) * self.batch_size]
+        X = augment_batch(self.X[batch], self.lengths[batch], self.rng)
+        
+        keep = self.rng.random(len(batch)) < self.keep_fraction
+        X[keep] = self.X[batch[keep]]
+        
+        return (X - self.mean) / self.scale, self.y[batch]
+        
+    def on_epoch_end(self):
+        self.order = self.rng.permutation(len(self.X))
+
+class StreamingBatches(tf.keras.utils.Sequence):
+    # Pads, augments and scales one batch at a time from the sequences, which
+    # may be views into a memory-mapped recording store, so memory use is
+    # bounded by the batch rather than the dataset. Padding is zero after
+    # scaling, the same as the predictor's window before it fills up.
+    def __init__(self, sequences, indices, y, scaler, max_length, batch_size=16,
+                 augmentation_factor=None, seed=None, shuffle=True):
+        super().__init__()
+        self.sequences = sequences
+        self.indices = np.asarray(indices)
+        self.y = y
+        self.mean = np.asarray(scaler.mean_, dtype=np.float32)
+        self.scale = np.asarray(scaler.scale_, dtype=np.float32)
+        self.max_length = max_length
+        self.batch_size = batch_size
+        self.augmentation_factor = augmentation_factor
+        self.shuffle = shuffle
+        self.rng = np.random.default_rng(seed)
+        self.order = self.rng.permutation(self.indices) if shuffle else self.indices
+        
+    def __len__(self):
+        return int(np.ceil(len(self.indices) / self.batch_size))
         
-        sequence_length = len(flex_little)
-        sequence = np.zeros((sequence_length, 9))
+    def __getitem__(self, index):
+        batch = self.order[index * self.batch_size:(index + 1) * self.batch_size]
+        X, lengths = pad_sequences([self.sequences[i] for i in batch], self.max_length)
         
-        for i in range(sequence_length):
-            sequence[i, 0] = flex_little[i]
-            sequence[i, 1] = flex_ring[i]
-            sequence[i, 2] = flex_middle[i]
-            sequence[i, 3] = flex_index[i]
-            sequence[i, 4] = flex_thumb[i]
-            sequence[i, 5] = quat_w[i]
-            sequence[i, 6] = quat_x[i]
-            sequence[i, 7] = quat_y[i]
-            sequence[i, 8] = quat_z[i]
+        if self.augmentation_factor:
+            augmented = augment_batch(X, lengths, self.rng)
+            keep = self.rng.random(len(batch)) < 1.0 / self.augmentation_factor
+            augmented[keep] = X[keep]
+            X = augmented
         
-        sequences.append(sequence)
-        labels.append(row['gesture'])
+        X -= self.mean
+        X /= self.scale
+        X *= (np.arange(self.max_length) >= (self.max_length - lengths)[:, np.newaxis])[:, :, np.newaxis]
+        return X, self.y[batch]
+        
+    def on_epoch_end(self):
+        if self.shuffle:
+            self.order = self.rng.permutation(self.indices)
+
+def fit_scaler_incremental(sequences, chunk_rows=65536):
+    # One pass over the recorded steps (padding excluded), a chunk of
+    # sequences at a time.
+    scaler = StandardScaler()
+    chunk = []
+    rows = 0
+    for sequence in sequences:
+        chunk.append(sequence)
+        rows += len(sequence)
+        if rows >= chunk_rows:
+            scaler.partial_fit(np.concatenate(chunk))
+            chunk = []
+            rows = 0
+    if chunk:
+        scaler.partial_fit(np.concatenate(chunk))
+    return scaler
+
+def load_dataset(dataset_path, augment=True, seed=None, workers=None):
+    # dataset_path is a recording store, a collected CSV file or a directory of
+    # CSV files; CSV files are parsed once and then read from their cache.
+    sequences = []
+    labels = []
+    for recordings in load_dataset_recordings(dataset_path, workers=workers):
+        sequences.extend(recordings.sequences())
+        labels.extend(recordings.gestures)
+    print(f"Loaded {len(sequences)} recordings from {dataset_path}")
     
     if augment:
-        sequences, labels = augment_time_series(sequences, labels, augmentation_factor=5)  # More augmentation
+        sequences, labels = augment_time_series(sequences, labels, augmentation_factor=5, seed=seed)  # More augmentation
         print(f"Data augmentation applied: {len(sequences)} sequences after augmentation")
     
     return sequences, labels
 
 def preprocess_data(sequences, labels):
-    max_length = max(len(seq) for seq in sequences)
-    
-    X_padded = np.zeros((len(sequences), max_length, sequences[0].shape[1]))
-    for i, seq in enumerate(sequences):
-        X_padded[i, -len(seq):] = seq
+    X_padded, _ = pad_sequences(sequences, dtype=np.float64)
+    max_length = X_padded.shape[1]
     
     scaler = StandardScaler()
     X_reshaped = X_padded.reshape(-1, X_padded.shape[2])
@@ -116,36 +265,215 @@ def preprocess_data(sequences, labels):
     
     return X_scaled, y_encoded, max_length, scaler, label_encoder
 
-def create_model(input_shape, num_classes):
+def create_model(input_shape, num_classes, filters=8, kernel_size=7, dropout=0.6, learning_rate=0.0002, dense_units=16,
+                 global_pooling=False):
+    # With global_pooling the Dense layers see the mean over time instead of
+    # every position, so input_shape may leave the length as None.
     model = Sequential()
     
     model.add(Normalization(input_shape=input_shape))
     
     model.add(AveragePooling1D(pool_size=2))
     
-    model.add(Conv1D(8, kernel_size=7, activation='relu', padding='same', 
+    model.add(Conv1D(filters, kernel_size=kernel_size, activation='relu', padding='same', 
                     kernel_regularizer=l2(0.01))) 
     model.add(BatchNormalization())
-    model.add(Dropout(0.6)) 
+    model.add(Dropout(dropout)) 
     
     model.add(AveragePooling1D(pool_size=2))
     
-    model.add(Flatten())
+    model.add(GlobalAveragePooling1D() if global_pooling else Flatten())
     
-    model.add(Dense(16, activation='relu', kernel_regularizer=l2(0.01)))
+    model.add(Dense(dense_units, activation='relu', kernel_regularizer=l2(0.01)))
     model.add(BatchNormalization())
-    model.add(Dropout(0.6)) 
+    model.add(Dropout(dropout)) 
     
     model.add(Dense(num_classes, activation='softmax', kernel_regularizer=l2(0.01)))
     
     model.compile(
-        optimizer=tf.keras.optimizers.Adam(learning_rate=0.0002),  
+        optimizer=tf.keras.optimizers.Adam(learning_rate=learning_rate),  
         loss='sparse_categorical_crossentropy',
         metrics=['accuracy']
     )
     
     return model
 
+def batch_norm_affine(layer):
+    gamma, beta, moving_mean, moving_variance = layer.get_weights()
+    scale = gamma / np.sqrt(moving_variance + layer.epsilon)
+    return scale, beta - moving_mean * scale
+
+def export_numpy_model(model, scaler, path):
+    layers = [layer for layer in model.layers if not isinstance(layer, Dropout)]
+    layer_types = [type(layer).__name__ for layer in layers]
+    expected_types = [
+        'Normalization', 'AveragePooling1D', 'Conv1D', 'BatchNormalization',
+        'AveragePooling1D', 'Flatten', 'Dense', 'BatchNormalization', 'Dense'
+    ]
+    global_pool = layer_types[5:6] == ['GlobalAveragePooling1D']
+    if global_pool:
+        expected_types[5] = 'GlobalAveragePooling1D'
+    if layer_types != expected_types:
+        raise ValueError(f"Cannot export layers {layer_types}, expected {expected_types}")
+    
+    norm, input_pool, conv, conv_bn, conv_pool, _, dense, dense_bn, output = layers
+    
+    # Fold Normalization into the convolution. Padding the pooled input with the
+    # normalization mean keeps the 'same' borders exact, as the mean maps to zero.
+    norm_mean = np.reshape(np.asarray(norm.mean), -1)
+    norm_scale = 1.0 / np.maximum(np.sqrt(np.reshape(np.asarray(norm.variance), -1)), 1e-7)
+    conv_kernel, conv_bias = conv.get_weights()
+    folded_conv_kernel = conv_kernel * norm_scale[np.newaxis, :, np.newaxis]
+    folded_conv_bias = conv_bias - np.einsum('kco,c->o', conv_kernel, norm_mean * norm_scale)
+    
+    # Each BatchNormalization sits after a ReLU, so it is folded into the Dense
+    # layer that consumes it instead (pooling and flattening are linear).
+    bn_scale, bn_shift = batch_norm_affine(conv_bn)
+    dense_kernel, dense_bias = dense.get_weights()
+    positions = dense_kernel.shape[0] // len(bn_scale)
+    folded_dense_kernel = dense_kernel * np.tile(bn_scale, positions)[:, np.newaxis]
+    folded_dense_bias = dense_bias + np.tile(bn_shift, positions) @ dense_kernel
+    
+    bn_scale, bn_shift = batch_norm_affine(dense_bn)
+    output_kernel, output_bias = output.get_weights()
+    folded_output_kernel = output_kernel * bn_scale[:, np.newaxis]
+    folded_output_bias = output_bias + bn_shift @ output_kernel
+    
+    np.savez(
+        path,
+        scaler_mean=np.asarray(scaler.mean_, dtype=np.float32),
+        scaler_scale=np.asarray(scaler.scale_, dtype=np.float32),
+        input_pool=np.array(np.ravel(input_pool.pool_size)[0]),
+        conv_kernel=folded_conv_kernel.astype(np.float32),
+        conv_bias=folded_conv_bias.astype(np.float32),
+        conv_pad_value=norm_mean.astype(np.float32),
+        conv_pool=np.array(np.ravel(conv_pool.pool_size)[0]),
+        global_pool=np.array(global_pool),
+        dense_kernel=folded_dense_kernel.astype(np.float32),
+        dense_bias=folded_dense_bias.astype(np.float32),
+        output_kernel=folded_output_kernel.astype(np.float32),
+        output_bias=folded_output_bias.astype(np.float32)
+    )
+    print(f"NumPy model weights exported to {path}")
+
+def validate_numpy_model(model, path, X, tolerance=1e-4):
+    keras_pred = model.predict(X, verbose=0)
+    numpy_pred = NumpyModel(path).predict_batch(X)
+    
+    max_error = float(np.max(np.abs(keras_pred - numpy_pred)))
+    agreement = float(np.mean(np.argmax(keras_pred, axis=1) == np.argmax(numpy_pred, axis=1)))
+    print(f"NumPy model check: max abs difference {max_error:.2e}, argmax agreement {agreement:.4f}")
+    
+    if max_error > tolerance:
+        print(f"WARNING: NumPy model differs from Keras model by more than {tolerance}")
+    
+    return max_error
+
+def export_tflite_model(model, path, quantization, calibration_data=None, calibration_windows=200):
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    
+    if quantization == 'float16':
+        converter.target_spec.supported_types = [tf.float16]
+    elif quantization == 'int8':
+        # Weights and activations are int8, with activation ranges calibrated
+        # on training windows. Input and output stay float32, so callers pass
+        # the same scaled windows as to the float model.
+        def representative_dataset():
+            for window in calibration_data[:calibration_windows]:
+                yield [np.asarray(window, dtype=np.float32)[np.newaxis]]
+        
+        converter.representative_dataset = representative_dataset
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    else:
+        raise ValueError(f"Unknown quantization '{quantization}', expected one of {QUANTIZATIONS}")
+    
+    with open(path, 'wb') as f:
+        f.write(converter.convert())
+    print(f"{quantization} TFLite model exported to {path} ({os.path.getsize(path) / 1024:.1f} KB)")
+
+def tflite_predictions(path, X, batch_size=64):
+    tflite_model = TFLiteModel(path)
+    return np.concatenate([tflite_model.predict_batch(X[i:i + batch_size]) for i in range(0, len(X), batch_size)])
+
+def export_quantized_models(model, quantizations, X_calibration, X_test, y_test, saved_model_dir, max_accuracy_drop=0.02):
+    # Each variant is compared against the float model on the test split and
+    # removed again if it loses more than max_accuracy_drop accuracy, so the
+    # predictor can never pick up a quantized model that failed the check.
+    float_pred = np.argmax(model.predict(X_test, verbose=0), axis=1)
+    float_accuracy = float(np.mean(float_pred == y_test))
+    report = {'float32': {'accuracy': float_accuracy}, 'max_accuracy_drop': max_accuracy_drop}
+    print(f"float32 model: test accuracy {float_accuracy:.4f}")
+    
+    for quantization in quantizations:
+        path = os.path.join(saved_model_dir, f'gesture_model_{quantization}.tflite')
+        export_tflite_model(model, path, quantization, X_calibration)
+        
+        y_pred = np.argmax(tflite_predictions(path, X_test), axis=1)
+        accuracy = float(np.mean(y_pred == y_test))
+        passed = float_accuracy - accuracy <= max_accuracy_drop
+        report[quantization] = {
+            'accuracy': accuracy,
+            'agreement': float(np.mean(y_pred == float_pred)),
+            'size_bytes': os.path.getsize(path),
+            'passed': passed
+        }
+        print(f"{quantization} model: test accuracy {accuracy:.4f}, "
+              f"agreement with float32 {report[quantization]['agreement']:.4f}")
+        
+        if not passed:
+            os.remove(path)
+            print(f"WARNING: {quantization} model loses {float_accuracy - accuracy:.4f} accuracy "
+                  f"(more than {max_accuracy_drop}), removed {path}")
+    
+    with open(os.path.join(saved_model_dir, 'quantization_report.json'), 'w') as f:
+        json.dump(report, f, indent=2)
+    
+    return report
+
+def remove_quantized_models(saved_model_dir):
+    # Exports from an earlier --quantize run belong to the old weights; left in
+    # place, publish() would copy them into the new version.
+    for name in [f'gesture_model_{quantization}.tflite' for quantization in QUANTIZATIONS] + ['quantization_report.json']:
+        path = os.path.join(saved_model_dir, name)
+        if os.path.exists(path):
+            os.remove(path)
+            print(f"Removed {path} from a previous training run")
+
+def batches_to_arrays(batches):
+    X, y = zip(*(batches[i] for i in range(len(batches))))
+    return np.concatenate(X), np.concatenate(y)
+
+def export_saved_model(quantizations=(), dataset_path=None, max_accuracy_drop=0.02, parse_workers=None):
+    dataset_dir = os.path.join(os.path.dirname(__file__), 'dataset')
+    saved_model_dir = os.path.join(os.path.dirname(__file__), 'saved_model')
+    
+    model = load_keras_model(saved_model_dir)
+    scaler = load(os.path.join(dataset_dir, 'feature_scaler.joblib'))
+    with open(os.path.join(saved_model_dir, 'model_params.json'), 'r') as f:
+        model_params = json.load(f)
+    
+    npz_path = os.path.join(saved_model_dir, 'gesture_model.npz')
+    export_numpy_model(model, scaler, npz_path)
+    
+    X = np.random.default_rng(42).normal(size=(64, model_params['max_length'], model_params['num_features']))
+    X = X.astype(np.float32)
+    validate_numpy_model(model, npz_path, X)
+    
+    if quantizations:
+        # Rebuild the training split main() used, scaled with the saved scaler.
+        sequences, labels = load_dataset(dataset_path or default_dataset_path(dataset_dir), augment=False,
+                                         workers=parse_workers)
+        with open(os.path.join(dataset_dir, 'label_encoder.json'), 'r') as f:
+            classes = json.load(f)['classes']
+        
+        X, _ = pad_sequences(sequences, model_params['max_length'])
+        X = ((X - scaler.mean_) / scaler.scale_).astype(np.float32)
+        y = np.array([classes.index(label) for label in labels])
+        X_train, X_test, _, y_test = train_test_split(X, y, test_size=0.4, random_state=42, stratify=y)
+        
+        export_quantized_models(model, quantizations, X_train, X_test, y_test, saved_model_dir, max_accuracy_drop)
+
 def plot_training_history(history):
     fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(15, 5))
     
@@ -194,7 +522,8 @@ def plot_model_architecture(model, filename):
         print("To enable model visualization, run: pip install pydot")
         print("And install graphviz from: https://graphviz.gitlab.io/download/")
 
-def main():
+def main(dataset_path=None, online_augmentation=False, streaming=False, quantizations=(), max_accuracy_drop=0.02,
+         publish_version=True, parse_workers=None, variable_length=False, window_length=DEFAULT_WINDOW_LENGTH):
     tf.random.set_seed(42)
     np.random.seed(42)
     
@@ -202,23 +531,92 @@ def main():
     saved_model_dir = os.path.join(os.path.dirname(__file__), 'saved_model')
     
     os.makedirs(saved_model_dir, exist_ok=True)
+    remove_quantized_models(saved_model_dir)
+    # Loaded before training overwrites the checkpoint in saved_model/.
+    current_model = load_current_model(saved_model_dir, dataset_dir) if variable_length else None
     
-    csv_path = os.path.join(dataset_dir, 'collected_data.csv')
+    dataset_path = dataset_path or default_dataset_path(dataset_dir)
     
-    sequences, labels = load_dataset(csv_path, augment=True)
-    X, y, max_length, scaler, label_encoder = preprocess_data(sequences, labels)
+    if streaming:
+        sequences, labels = load_dataset(dataset_path, augment=False, workers=parse_workers)
+        
+        label_encoder = LabelEncoder()
+        y = label_encoder.fit_transform(labels)
+        max_length = max(len(seq) for seq in sequences)
+        num_features = sequences[0].shape[1]
+        scaler = fit_scaler_incremental(sequences)
+    else:
+        sequences, labels = load_dataset(dataset_path, augment=not online_augmentation, seed=42,
+                                         workers=parse_workers)
+        X, y, max_length, scaler, label_encoder = preprocess_data(sequences, labels)
+        num_features = X.shape[2]
     
     class_names = label_encoder.classes_
     num_classes = len(class_names)
     
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.4, random_state=42, stratify=y)
+    if streaming:
+        train_idx, test_idx = train_test_split(np.arange(len(y)), test_size=0.4, random_state=42, stratify=y)
+        fit_idx, val_idx = train_test_split(train_idx, test_size=0.3, random_state=42, stratify=y[train_idx])
+        y_test, y_train = y[test_idx], y[train_idx]
+        
+        fit_data = {
+            'x': StreamingBatches(sequences, fit_idx, y, scaler, max_length,
+                                  augmentation_factor=5, seed=42),
+            'validation_data': StreamingBatches(sequences, val_idx, y, scaler, max_length, shuffle=False)
+        }
+        X_test = StreamingBatches(sequences, test_idx, y, scaler, max_length, shuffle=False)
+        X_check = X_test[0][0]
+        X_calibration = StreamingBatches(sequences, fit_idx[:200], y, scaler, max_length, shuffle=False)
+        print(f"Streaming training: {len(fit_idx)} training sequences, padded to {max_length} per batch")
+    elif online_augmentation:
+        X_raw, lengths = pad_sequences(sequences)
+        
+        train_idx, test_idx = train_test_split(np.arange(len(X)), test_size=0.4, random_state=42, stratify=y)
+        fit_idx, val_idx = train_test_split(train_idx, test_size=0.3, random_state=42, stratify=y[train_idx])
+        X_test, y_test, y_train = X[test_idx], y[test_idx], y[train_idx]
+        X_check = X_test
+        X_calibration = X[fit_idx]
+        
+        fit_data = {
+            'x': AugmentedBatches(X_raw[fit_idx], lengths[fit_idx], y[fit_idx], scaler,
+                                  batch_size=16, augmentation_factor=5, seed=42),
+            'validation_data': (X[val_idx], y[val_idx])
+        }
+        print(f"On-the-fly augmentation: {len(fit_idx)} training sequences, re-augmented every epoch")
+    elif variable_length:
+        # Trained and tested on random crops of window_length steps. The last
+        # window of every test recording is kept as well, to report accuracy
+        # at the point where a gesture has just been completed.
+        lengths = np.minimum([len(seq) for seq in sequences], max_length)
+        window_length = min(window_length, max_length)
+        train_idx, test_idx = train_test_split(np.arange(len(X)), test_size=0.4, random_state=42, stratify=y)
+        X_train, rows = random_crops(X[train_idx], lengths[train_idx], window_length, CROPS_PER_SEQUENCE, seed=42)
+        X_train, y_train = X_train.astype(np.float32), y[train_idx][rows]
+        test_ends = crop_ends(lengths[test_idx], max_length, window_length, CROPS_PER_SEQUENCE, seed=43)
+        X_test = windows_ending_at(X[test_idx], test_ends, window_length).astype(np.float32)
+        y_test = np.repeat(y[test_idx], CROPS_PER_SEQUENCE)
+        X_end = X[test_idx, max_length - window_length:].astype(np.float32)
+        y_end = y[test_idx]
+        X_check = X_test
+        X_calibration = X_train
+        fit_data = {'x': X_train, 'y': y_train, 'batch_size': 16, 'validation_split': 0.3}
+        print(f"Variable-length training: {len(X_train)} windows of {window_length} steps "
+              f"cut from {len(train_idx)} sequences")
+    else:
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.4, random_state=42, stratify=y)
+        X_check = X_test
+        X_calibration = X_train
+        fit_data = {'x': X_train, 'y': y_train, 'batch_size': 16, 'validation_split': 0.3}
     
     unique_classes = np.unique(y_train)
     class_weights = compute_class_weight(class_weight='balanced', classes=unique_classes, y=y_train)
     class_weight_dict = {i: weight for i, weight in zip(unique_classes, class_weights)}
     print(f"Class weights: {class_weight_dict}")
     
-    model = create_model((max_length, X.shape[2]), num_classes)
+    if variable_length:
+        model = create_model((None, num_features), num_classes, global_pooling=True)
+    else:
+        model = create_model((max_length, num_features), num_classes)
     
     model.summary()
     
@@ -237,16 +635,32 @@ def main():
     ]
     
     history = model.fit(
-        X_train, y_train,
+        **fit_data,
         epochs=50,  
-        batch_size=16,  
-        validation_split=0.3,  
         callbacks=callbacks,
         class_weight=class_weight_dict
     )
     
-    test_loss, test_acc = model.evaluate(X_test, y_test)
+    test_loss, test_acc = model.evaluate(X_test) if streaming else model.evaluate(X_test, y_test)
     print(f'Test accuracy: {test_acc:.4f}')
+    if variable_length:
+        _, end_acc = model.evaluate(X_end, y_end, verbose=0)
+        print(f'Test accuracy on the last {window_length} steps of each recording: {end_acc:.4f}')
+        
+        if current_model is not None:
+            # Same held-out recordings and end points, each model reading its
+            # own window. The split uses the fixed-length path's random_state,
+            # so on an unchanged dataset the current model never saw them.
+            X_raw = X[test_idx] * scaler.scale_ + scaler.mean_
+            last_ends = np.full((len(test_idx), 1), max_length)
+            crop_acc = current_model_accuracy(current_model, X_raw, test_ends, y_test, class_names)
+            last_acc = current_model_accuracy(current_model, X_raw, last_ends, y_end, class_names)
+            print(f"{'':<28}{'crops':>8}{'last window':>13}")
+            print(f"{f'current ({current_model.max_length} steps)':<28}{crop_acc:>8.4f}{last_acc:>13.4f}")
+            print(f"{f'variable ({window_length} steps)':<28}{test_acc:>8.4f}{end_acc:>13.4f}")
+            if test_acc < crop_acc or end_acc < last_acc:
+                print("WARNING: the variable-length model is less accurate than the current model "
+                      "on these windows")
     
     y_pred = np.argmax(model.predict(X_test), axis=1)
     
@@ -255,10 +669,13 @@ def main():
     plot_training_history(history)
     plot_confusion_matrix(y_test, y_pred, class_names)
     
+    # For a variable-length model max_length is the window the predictor
+    # keeps; shorter windows are run as they are, without padding.
     model_params = {
-        'max_length': max_length,
-        'num_features': X.shape[2],
-        'num_classes': num_classes
+        'max_length': window_length if variable_length else max_length,
+        'num_features': num_features,
+        'num_classes': num_classes,
+        'variable_length': variable_length
     }
     
     with open(os.path.join(saved_model_dir, 'model_params.json'), 'w') as f:
@@ -268,6 +685,16 @@ def main():
     
     dump(scaler, os.path.join(dataset_dir, 'feature_scaler.joblib'))
     
+    npz_path = os.path.join(saved_model_dir, 'gesture_model.npz')
+    export_numpy_model(model, scaler, npz_path)
+    validate_numpy_model(model, npz_path, X_check)
+    
+    if quantizations:
+        if streaming:
+            X_calibration = batches_to_arrays(X_calibration)[0]
+            X_test = batches_to_arrays(X_test)[0]
+        export_quantized_models(model, quantizations, X_calibration, X_test, y_test, saved_model_dir, max_accuracy_drop)
+    
     class_mapping = {
         'classes': class_names.tolist()
     }
@@ -275,7 +702,45 @@ def main():
     with open(os.path.join(dataset_dir, 'label_encoder.json'), 'w') as f:
         json.dump(class_mapping, f)
     
+    if publish_version:
+        version = publish(saved_model_dir, saved_model_dir, dataset_dir)
+        print(f'Published and activated model version {version}')
+    
     print('Model training completed and saved successfully.')
 
+def parse_args():
+    parser = argparse.ArgumentParser(description='Train the gesture recognition model')
+    parser.add_argument('--export-only', action='store_true',
+                        help='export the saved Keras model to NumPy weights without retraining')
+    parser.add_argument('--online-augmentation', action='store_true',
+                        help='augment each training batch on the fly instead of storing 5x the dataset')
+    parser.add_argument('--streaming', action='store_true',
+                        help='fit the scaler incrementally and pad, augment and scale one batch at a time')
+    parser.add_argument('--dataset',
+                        help='recording store directory, collected CSV file or directory of CSV files '
+                             '(default: dataset/recordings if present, else dataset/collected_data.csv)')
+    parser.add_argument('--parse-workers', type=int, default=None,
+                        help='processes used to parse CSV files without a cache (default: one per CPU)')
+    parser.add_argument('--quantize', nargs='+', choices=QUANTIZATIONS, default=[],
+                        help='also export post-training quantized TFLite models')
+    parser.add_argument('--no-publish', action='store_true',
+                        help='do not publish the trained model as a new active registry version')
+    parser.add_argument('--max-accuracy-drop', type=float, default=0.02,
+                        help='discard a quantized model that loses more test accuracy than this')
+    parser.add_argument('--variable-length', action='store_true',
+                        help='train a length-agnostic model (global pooling) on random windows of --window-length steps')
+    parser.add_argument('--window-length', type=int, default=DEFAULT_WINDOW_LENGTH,
+                        help='window of a variable-length model, in samples (default: %(default)s)')
+    args = parser.parse_args()
+    if args.variable_length and (args.streaming or args.online_augmentation):
+        parser.error('--variable-length cannot be combined with --streaming or --online-augmentation')
+    return args
+
 if __name__ == '__main__':
-    main()
+    args = parse_args()
+    
+    if args.export_only:
+        export_saved_model(args.quantize, args.dataset, args.max_accuracy_drop, args.parse_workers)
+    else:
+        main(args.dataset, args.online_augmentation, args.streaming, args.quantize, args.max_accuracy_drop,
+             not args.no_publish, args.parse_workers, args.variable_length, args.window_length)